@@ -1,10 +1,11 @@
 import streamlit as st
-import pandas as pd
 import os
 from datetime import datetime
 from fpdf import FPDF
 from pathlib import Path
 
+from boq_store import BOQStore
+
 # ---------- BOQ ITEM SETUP ----------
 item_units = {
     "Bricks": "pieces",
@@ -19,7 +20,7 @@ now = datetime.now().strftime("%Y%m%d")  # Format: YYYYMMDD
 
 # ---------- SESSION STATE ----------
 if "boq_data" not in st.session_state:
-    st.session_state.boq_data = []
+    st.session_state.boq_data = BOQStore()
 
 # ---------- FORM ----------
 with st.form("boq_form"):
@@ -30,36 +31,15 @@ with st.form("boq_form"):
 
     if submitted:
         unit = item_units[description]
-        total = quantity * unit_price
-
-        # Check if item already exists to update
-        updated = False
-        for item in st.session_state.boq_data:
-            if item["Item Name"] == description:
-                item["Quantity"] = quantity
-                item["Unit Price"] = unit_price
-                item["Total"] = total
-                updated = True
-                break
-
-        if not updated:
-            st.session_state.boq_data.append({
-                "Item Name": description,
-                "Quantity": quantity,
-                "Unit": unit,
-                "Unit Price": unit_price,
-                "Total": total
-            })
+        # Updates the existing line for this item, or adds a new one
+        st.session_state.boq_data.upsert(description, quantity, unit, unit_price)
 
         st.success(f"Item '{description}' added/updated successfully!")
 
 # ---------- DISPLAY BOQ ----------
 if st.session_state.boq_data:
-    df = pd.DataFrame(st.session_state.boq_data)
-    df.index = df.index + 1
-    df.index.name = "Sr#"
-
-    total_sum = df["Total"].sum()
+    df = st.session_state.boq_data.frame()
+    total_sum = st.session_state.boq_data.grand_total
 
     st.dataframe(df.style.format({
         "Quantity": "{:.2f}",
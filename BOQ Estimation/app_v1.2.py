@@ -1,31 +1,86 @@
 import streamlit as st
-import pandas as pd
-from pathlib import Path
+import os
+import sys
 from datetime import datetime
-from fpdf import FPDF
+from pathlib import Path
+
+from boq_store import BOQStore
+
+SHARED_DIR = str(Path(__file__).resolve().parent.parent)  # shared instrumentation and startup modules
+if SHARED_DIR not in sys.path:
+    sys.path.append(SHARED_DIR)
+import instrumentation as instr
+import startup
+
+# Per-stage timings of every rerun (recorded only when INSTRUMENTATION=1)
+instr.start_run("boq")
+
+# The catalog, search, pricing and export modules pull in pandas, NumPy and
+# fpdf, so they are imported where they are first used (and warmed in the
+# background after the first render) rather than before the page is shown
+BOQ_MODULES = ("rate_catalog", "item_search", "boq_pricing", "boq_export")
+
+
+def end_run():
+    """Log this run's timings and start the background imports.
+
+    Called at the end of the script and before every ``st.rerun()``, which
+    stops the script before it gets there.
+    """
+    instr.sidebar_panel(st, instr.finish())
+    startup.warm_imports(*BOQ_MODULES, path=Path(__file__).resolve().parent)
+
+
+def rerun():
+    end_run()
+    st.rerun()
+
 
 # ----------- Load Items from Excel ------------
+# Parsed catalogs are compiled to disk by workbook hash, so restarts and new
+# workers skip re-parsing the schedule
+@st.cache_resource
+def load_rate_catalog(excel_bytes):
+    from rate_catalog import load_catalog
+    return load_catalog(excel_bytes)
+
 @st.cache_data
-def load_all_items(excel_path):
-    xl = pd.ExcelFile(excel_path)
-    all_items = []
-    for sheet in xl.sheet_names:
-        df = xl.parse(sheet)
-        df = df.dropna()
-        if df.shape[1] >= 3:
-            for _, row in df.iterrows():
-                desc = str(row.iloc[0]).strip()
-                unit = str(row.iloc[1]).strip()
-                try:
-                    rate = float(row.iloc[2])
-                except:
-                    continue
-                all_items.append({"desc": desc, "unit": unit, "rate": rate})
-    return all_items
+def load_all_items(excel_bytes):
+    return load_rate_catalog(excel_bytes).items()
+
+# Search index is built once per uploaded catalog, not on every keystroke
+@st.cache_resource
+def load_item_index(excel_bytes):
+    from item_search import ItemIndex
+    return ItemIndex(load_all_items(excel_bytes))
+
+# Exports are built in memory when a download button is clicked (outside the
+# script run) and cached per BOQ table; nothing is written to the server
+@st.cache_data
+def boq_xlsx(df, grand_total):
+    from boq_export import xlsx_bytes
+    return xlsx_bytes(df, grand_total)
+
+@st.cache_data
+def boq_pdf(df, grand_total):
+    from boq_export import pdf_bytes
+    return pdf_bytes(df, grand_total)
+
+# Optional schedule used until one is uploaded; it is read and compiled in
+# the background from the first session on, while the page renders
+def read_default_schedule(path):
+    from rate_catalog import load_catalog
+    data = Path(path).read_bytes()
+    load_catalog(data)  # compile to the disk cache
+    return data
+
+DEFAULT_SCHEDULE = os.environ.get("BOQ_DEFAULT_SCHEDULE")
+default_schedule = (startup.preload(("default schedule", DEFAULT_SCHEDULE), read_default_schedule, DEFAULT_SCHEDULE)
+                    if DEFAULT_SCHEDULE else None)
 
 # ---------- Session State ----------
 if "boq_data" not in st.session_state:
-    st.session_state.boq_data = []
+    st.session_state.boq_data = BOQStore()
 
 # ---------- Streamlit Page Settings ----------
 st.set_page_config(layout="wide")
@@ -75,9 +130,29 @@ with upload_col:
     excel_file = st.file_uploader("📁", type=["xlsx", "xls"], label_visibility="collapsed")
 
 # ---------- Main Logic ----------
+excel_bytes = None
 if excel_file:
-    items = load_all_items(excel_file)
-    all_descriptions = [item["desc"] for item in items]
+    excel_bytes = excel_file.getvalue()
+elif default_schedule is not None:
+    try:
+        excel_bytes = default_schedule.result()
+    except Exception as e:
+        st.error(f"❌ Could not load the default item schedule {DEFAULT_SCHEDULE}: {e}")
+    else:
+        st.caption(f"Using the default item schedule `{Path(DEFAULT_SCHEDULE).name}`; upload a file to replace it.")
+
+if excel_bytes is not None:
+    from boq_pricing import boq_lines, item_key, price_takeoff, read_takeoff
+    from rate_catalog import content_hash
+
+    with instr.span("load_all_items"):
+        index = load_item_index(excel_bytes)
+    instr.count("catalog items", len(index))
+
+    rejected = load_rate_catalog(excel_bytes).rejected
+    if len(rejected):
+        with st.expander(f"⚠️ {len(rejected)} row(s) in the item schedule were skipped"):
+            st.dataframe(rejected, use_container_width=True, hide_index=True)
 
     if "search_term" not in st.session_state:
         st.session_state.search_term = ""
@@ -86,7 +161,9 @@ if excel_file:
     st.session_state.search_term = st.text_input("", value=st.session_state.search_term)
 
     search = st.session_state.search_term.lower()
-    matched_items = [d for d in all_descriptions if search in d.lower()]
+    with instr.span("search"):
+        matched_items = index.search(search)
+    instr.count("matches", len(matched_items))
 
     if matched_items:
         st.markdown("### ➕ Add or Update Item")
@@ -94,7 +171,7 @@ if excel_file:
             form_col1, form_col2, form_col3, form_col4 = st.columns([4, 2, 2, 2])
             with form_col1:
                 selected = st.selectbox("Select Matching Item", matched_items)
-            matched = next((i for i in items if i["desc"] == selected), None)
+            matched = index.get(selected)
             unit = matched["unit"]
             rate = matched["rate"]
             with form_col2:
@@ -106,34 +183,70 @@ if excel_file:
                 submitted = st.form_submit_button("✅ Add / Update Item")
 
             if submitted:
-                total = quantity * rate
-                existing_index = next((i for i, item in enumerate(st.session_state.boq_data)
-                                       if item["Item Name"] == selected), None)
-                new_row = {
-                    "Item Name": selected,
-                    "Quantity": quantity,
-                    "Unit": unit,
-                    "Unit Price": rate,
-                    "Total": total
-                }
-                if existing_index is not None:
-                    st.session_state.boq_data[existing_index] = new_row
-                    st.success(f"✅ '{selected}' updated.")
-                else:
-                    st.session_state.boq_data.append(new_row)
+                added = st.session_state.boq_data.upsert(selected, quantity, unit, rate,
+                                                         category=matched.get("sheet"),
+                                                         key=item_key(selected, matched.get("code")))
+                if added:
                     st.success(f"✅ '{selected}' added.")
-                st.rerun()
+                else:
+                    st.success(f"✅ '{selected}' updated.")
+                rerun()
     else:
         if search:
             st.warning("No matching item found.")
+
+    # ---------- Bulk Import ----------
+    with st.expander("📄 Bulk Import Take-off"):
+        takeoff_file = st.file_uploader("Take-off sheet (description and quantity columns)",
+                                        type=["xlsx", "xls", "csv"], key="takeoff_file")
+        if takeoff_file:
+            try:
+                with instr.span("price take-off"):
+                    result = price_takeoff(read_takeoff(takeoff_file, takeoff_file.name),
+                                           load_all_items(excel_bytes))
+                instr.count("take-off lines", len(result.priced) + len(result.unmatched))
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                counts = result.counts
+                st.markdown(f"**Item-code matches:** {counts['code']}  \n"
+                            f"**Exact matches:** {counts['exact']}  \n"
+                            f"**Normalized-text matches:** {counts['normalized']}  \n"
+                            f"**Unmatched:** {counts['unmatched']}")
+                if len(result.unmatched):
+                    st.dataframe(result.unmatched, use_container_width=True, hide_index=True)
+                    st.download_button("⬇️ Unmatched Lines (CSV)", result.unmatched.to_csv(index=False).encode("utf-8"),
+                                       file_name="unmatched_takeoff_lines.csv", mime="text/csv")
+                if len(result.priced) and st.button("✅ Add Priced Lines to BOQ"):
+                    lines = boq_lines(result.priced)
+                    for name, qty, unit, rate, category, key in lines.itertuples(index=False, name=None):
+                        st.session_state.boq_data.upsert(name, qty, unit, rate, category=category, key=key)
+                    rerun()
+
+    # ---------- Save / Open BOQ ----------
+    # Saved BOQs keep each line's catalog item key so they can be repriced
+    # against a revised schedule with boq_reprice.py
+    with st.expander("💾 Save / Open BOQ"):
+        saved_file = st.file_uploader("Open a saved BOQ", type=["json"], key="saved_boq")
+        if saved_file and st.session_state.get("opened_boq") != saved_file.file_id:
+            st.session_state.boq_data, st.session_state.project_name = BOQStore.from_json(saved_file.getvalue())
+            st.session_state.opened_boq = saved_file.file_id
+
+        project = st.text_input("Project name", key="project_name")
+        if st.session_state.boq_data and project:
+            saved = st.session_state.boq_data.to_json(project, catalog=content_hash(excel_bytes))
+            st.download_button("⬇️ Save BOQ", data=saved.encode("utf-8"), file_name=f"{project}.json",
+                               mime="application/json")
 else:
     st.info("📁 Please upload an Excel file to begin.")
 
 # ---------- Show Table & Total ----------
 if st.session_state.boq_data:
-    df = pd.DataFrame(st.session_state.boq_data)
-    df.index += 1
-    total_sum = df["Total"].sum()
+    boq = st.session_state.boq_data
+    with instr.span("boq table"):
+        df = boq.frame()
+        total_sum = boq.grand_total
+    instr.count("boq lines", len(df))
 
     col_title, col_gt = st.columns([6, 1])
     with col_title:
@@ -157,58 +270,32 @@ if st.session_state.boq_data:
         height=450
     )
 
+    subtotals = boq.subtotals()
+    if any(subtotals):  # categories are known for catalog items
+        st.markdown("  \n".join(f"**{category or 'Other'}:** Rs. {amount:,.2f}"
+                                 for category, amount in subtotals.items()))
+
     col_del1, col_del2 = st.columns([3, 1])
     with col_del1:
-        delete_idx = st.number_input("Enter Sr# to delete", min_value=1, max_value=len(df), step=1)
+        delete_sr = st.selectbox("Select Sr# to delete", boq.serials())
     with col_del2:
         if st.button("❌ Delete Selected Item"):
-            st.session_state.boq_data.pop(delete_idx - 1)
-            st.rerun()
+            boq.delete_sr(delete_sr)
+            rerun()
 
     st.markdown(f"### 🧮 Running Grand Total: Rs. {total_sum:,.2f}")
 
     now = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-    if st.button("📥 Download Excel"):
-        excel_path = Path.cwd() / f"BOQ_{now}.xlsx"
-        df.to_excel(excel_path, index_label="Sr#")
-        st.success(f"✅ Excel saved: {excel_path.name}")
-
-    if st.button("🖨️ Print PDF"):
-        pdf = FPDF()
-        pdf.add_page()
-        # pdf.set_font("Arial", size=12)
-        pdf.set_font("Arial", style="B", size=18)  # Bold + larger size
-        pdf.cell(200, 10, "Bill of Quantities", ln=True, align="C")
-        pdf.ln(5)
-
-        col_widths = [15, 55, 25, 20, 30, 30]
-        headers = ["Sr#", "Item Name", "Quantity", "Unit", "Unit Price", "Total"]
-        total_table_width = sum(col_widths)
-
-        pdf.set_font("Arial", "B", 10)
-        pdf.set_fill_color(200, 220, 255)
-        pdf.set_x((pdf.w - total_table_width) / 2)
-        for i, h in enumerate(headers):
-            pdf.cell(col_widths[i], 10, h, border=1, align="C", fill=True)
-        pdf.ln()
-
-        pdf.set_font("Arial", "", 10)
-        for idx, row in df.iterrows():
-            pdf.set_x((pdf.w - total_table_width) / 2)
-            pdf.cell(col_widths[0], 10, str(idx), border=1, align="C")
-            pdf.cell(col_widths[1], 10, row["Item Name"][:25], border=1)
-            pdf.cell(col_widths[2], 10, f"{row['Quantity']:.2f}", border=1, align="C")
-            pdf.cell(col_widths[3], 10, row["Unit"], border=1, align="C")
-            pdf.cell(col_widths[4], 10, f"{row['Unit Price']:.2f}", border=1, align="C")
-            pdf.cell(col_widths[5], 10, f"{row['Total']:.2f}", border=1, align="C")
-            pdf.ln()
-
-        pdf.set_x((pdf.w - total_table_width) / 2)
-        pdf.set_font("Arial", "B", 10)
-        pdf.cell(sum(col_widths[:-1]), 10, "Grand Total", border=1, align="R")
-        pdf.cell(col_widths[-1], 10, f"{total_sum:.2f}", border=1, align="C")
-
-        pdf_path = Path.cwd() / f"BOQ_{now}.pdf"
-        pdf.output(str(pdf_path))
-        st.success(f"✅ PDF saved: {pdf_path.name}")
+    # the download callables run outside the script, where this directory is
+    # not on sys.path, so the export module is imported here
+    import boq_export  # noqa: F401
+    col_xlsx, col_pdf = st.columns(2)
+    with col_xlsx:
+        st.download_button("📥 Download Excel", data=lambda: boq_xlsx(df, total_sum), file_name=f"BOQ_{now}.xlsx",
+                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    with col_pdf:
+        st.download_button("🖨️ Print PDF", data=lambda: boq_pdf(df, total_sum), file_name=f"BOQ_{now}.pdf",
+                           mime="application/pdf")
+
+end_run()
@@ -0,0 +1,202 @@
+"""Excel and PDF exports of a BOQ, built in memory for download buttons.
+
+The Excel export uses xlsxwriter's constant-memory mode, which flushes each
+row to disk as soon as the next one starts.  That mode needs a file on disk
+(xlsxwriter's ``in_memory`` option turns it off), so the workbook is written
+to a temporary file that is read back and removed.
+
+The PDF export is a paginated table: column headers repeat on every page,
+long item names wrap onto extra lines instead of being cut off (continuing
+on the next page if they are taller than one), and each page ends with its
+running total, which the next page brings forward.
+"""
+import io
+import os
+import tempfile
+
+from fpdf import FPDF
+
+try:
+    import xlsxwriter
+except ImportError:  # fall back to pandas/openpyxl, which holds the sheet in memory
+    xlsxwriter = None
+
+EXPORT_COLUMNS = ["Sr#", "Item Name", "Quantity", "Unit", "Unit Price", "Total"]
+
+# PDF table layout (mm); widths follow the original single-page table
+COL_WIDTHS = [15, 55, 25, 20, 30, 30]
+COL_ALIGN = ["C", "L", "C", "C", "C", "C"]
+LINE_HEIGHT = 6
+HEADER_HEIGHT = 10
+
+
+def _rows(df):
+    """(Sr#, name, quantity, unit, unit price, total) tuples of a BOQ frame indexed by Sr#."""
+    cols = df[["Item Name", "Quantity", "Unit", "Unit Price", "Total"]]
+    return ((sr, *values) for sr, *values in cols.itertuples(index=True, name=None))
+
+
+# ---------- Excel ----------
+def xlsx_bytes(df, grand_total):
+    """The BOQ as an .xlsx file, returned as bytes."""
+    if xlsxwriter is None:
+        buffer = io.BytesIO()
+        df.to_excel(buffer, index_label="Sr#")
+        return buffer.getvalue()
+
+    fd, path = tempfile.mkstemp(prefix="boq-", suffix=".xlsx")
+    os.close(fd)
+    try:
+        workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+        sheet = workbook.add_worksheet("BOQ")
+        bold = workbook.add_format({"bold": True})
+        money = workbook.add_format({"num_format": "#,##0.00"})
+        sheet.set_column(1, 1, 50)
+        sheet.set_column(2, 5, 14)
+
+        # constant-memory mode requires writing strictly row by row
+        sheet.write_row(0, 0, EXPORT_COLUMNS, bold)
+        row_num = 0
+        for row_num, (sr, name, qty, unit, price, total) in enumerate(_rows(df), start=1):
+            sheet.write_number(row_num, 0, sr)
+            sheet.write_string(row_num, 1, str(name))
+            sheet.write_number(row_num, 2, qty, money)
+            sheet.write_string(row_num, 3, str(unit))
+            sheet.write_number(row_num, 4, price, money)
+            sheet.write_number(row_num, 5, total, money)
+        sheet.write_string(row_num + 1, 4, "Grand Total", bold)
+        sheet.write_number(row_num + 1, 5, grand_total, money)
+        workbook.close()
+
+        with open(path, "rb") as fh:
+            return fh.read()
+    finally:
+        os.remove(path)
+
+
+# ---------- PDF ----------
+def _latin1(text):
+    # the core PDF fonts only cover latin-1
+    return str(text).encode("latin-1", "replace").decode("latin-1")
+
+
+class BOQPDF(FPDF):
+    def __init__(self):
+        super().__init__()
+        self.alias_nb_pages()
+        self.set_auto_page_break(False)
+        self.table_x = (self.w - sum(COL_WIDTHS)) / 2
+        self._widths = {}
+
+    def footer(self):
+        self.set_y(-12)
+        self.set_font("Arial", "I", 8)
+        self.cell(0, 8, f"Page {self.page_no()} of {{nb}}", align="C")
+
+    def table_header(self):
+        self.set_font("Arial", "B", 10)
+        self.set_fill_color(200, 220, 255)
+        self.set_x(self.table_x)
+        for width, heading in zip(COL_WIDTHS, EXPORT_COLUMNS):
+            self.cell(width, HEADER_HEIGHT, heading, border=1, align="C", fill=True)
+        self.ln()
+        self.set_font("Arial", "", 10)
+
+    def total_row(self, label, amount):
+        self.set_font("Arial", "B", 10)
+        self.set_x(self.table_x)
+        self.cell(sum(COL_WIDTHS[:-1]), HEADER_HEIGHT, label, border=1, align="R")
+        self.cell(COL_WIDTHS[-1], HEADER_HEIGHT, f"{amount:,.2f}", border=1, align="C")
+        self.ln()
+        self.set_font("Arial", "", 10)
+
+    def text_width(self, text):
+        # item names repeat the same words (and long words the same characters), so widths are cached
+        width = self._widths.get(text)
+        if width is None:
+            width = self._widths[text] = self.get_string_width(text)
+        return width
+
+    def wrap(self, text, width):
+        """Split ``text`` into lines that fit a cell ``width`` mm wide."""
+        limit = width - 2 * self.c_margin
+        space = self.text_width(" ")
+        lines, current, current_width = [], "", 0.0
+        for word in text.split():
+            word_width = self.text_width(word)
+            if current and current_width + space + word_width <= limit:
+                current, current_width = f"{current} {word}", current_width + space + word_width
+                continue
+            if current:
+                lines.append(current)
+            if word_width <= limit:
+                current, current_width = word, word_width
+                continue
+            # a single word wider than the cell is broken by characters, adding up their widths
+            current, current_width = "", 0.0
+            for ch in word:
+                ch_width = self.text_width(ch)
+                if current and current_width + ch_width > limit:
+                    lines.append(current)
+                    current, current_width = "", 0.0
+                current += ch
+                current_width += ch_width
+        lines.append(current)
+        return lines
+
+    def table_row(self, cells, name_lines):
+        """One table row; the item name (column 1) is drawn as ``name_lines``."""
+        height = LINE_HEIGHT * len(name_lines)
+        x, y = self.table_x, self.get_y()
+        for col, (width, align, value) in enumerate(zip(COL_WIDTHS, COL_ALIGN, cells)):
+            self.rect(x, y, width, height)
+            if col == 1:
+                for i, line in enumerate(name_lines):
+                    self.set_xy(x, y + i * LINE_HEIGHT)
+                    self.cell(width, LINE_HEIGHT, line, align=align)
+            else:
+                self.set_xy(x, y)
+                self.cell(width, height, value, align=align)
+            x += width
+        self.set_xy(self.table_x, y + height)
+
+
+def pdf_bytes(df, grand_total, title="Bill of Quantities"):
+    """The BOQ as a paginated PDF table, returned as bytes."""
+    pdf = BOQPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", style="B", size=18)
+    pdf.cell(0, 10, title, ln=True, align="C")
+    pdf.ln(5)
+    pdf.table_header()
+
+    # leave room for the page's carried-forward (or grand total) row and the footer
+    bottom = pdf.h - 15 - HEADER_HEIGHT
+    running = 0.0
+    fresh = True  # no rows on this page yet
+    for sr, name, qty, unit, price, total in _rows(df):
+        name_lines = pdf.wrap(_latin1(name), COL_WIDTHS[1])
+        cells = [str(sr), None, f"{qty:.2f}", _latin1(unit), f"{price:.2f}", f"{total:.2f}"]
+        while name_lines:
+            fits = int((bottom - pdf.get_y()) // LINE_HEIGHT)
+            # a row moves to the next page whole, unless it is taller than a page
+            if fits < 1 or (fits < len(name_lines) and not fresh):
+                pdf.total_row("Carried forward", running)
+                pdf.add_page()
+                pdf.table_header()
+                pdf.total_row("Brought forward", running)
+                fresh = True
+                continue
+            part, name_lines = name_lines[:fits], name_lines[fits:]
+            pdf.table_row(cells, part)
+            if cells[0]:
+                running += total
+            cells = [""] * len(cells)  # the rest of the name continues with blank cells
+            fresh = False
+
+    pdf.total_row("Grand Total", grand_total)
+
+    document = pdf.output(dest="S")
+    if isinstance(document, str):  # older fpdf hands the document back as text, one character per byte
+        document = document.encode("latin-1")
+    return bytes(document)
@@ -0,0 +1,153 @@
+"""Bulk pricing of a quantity take-off against the rate catalog.
+
+A take-off is a sheet of (description, quantity) lines.  Every line is
+priced in one pass: first a merge on the exact catalog description, then a
+second merge for the lines left over on a normalized form of the text
+(case, punctuation and spacing ignored).  When the take-off's item column
+is headed ``code`` or ``item code``, its lines are merged on the catalog's
+item codes before the description merges.  Lines that match neither, whose
+quantity is not a number or whose description is blank are returned
+separately with the reason; only wholly empty rows are skipped.
+"""
+import re
+from collections import namedtuple
+
+import pandas as pd
+
+from rate_catalog import item_codes
+
+PRICED_COLUMNS = ["Line", "Take-off Description", "Item Name", "Quantity", "Unit", "Unit Price", "Total",
+                  "Category", "Match", "Item Key"]
+UNMATCHED_COLUMNS = ["Line", "Take-off Description", "Quantity", "Reason"]
+
+DESCRIPTION_NAMES = ("description", "desc", "item", "item name", "item description", "code", "item code")
+QUANTITY_NAMES = ("quantity", "qty", "qty.", "quantities")
+CODE_NAMES = ("code", "item code")
+
+PricingResult = namedtuple("PricingResult", ["priced", "unmatched", "counts"])
+
+NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text):
+    """Lowercase, with runs of anything but letters and digits as one space."""
+    return (text.astype(str).str.lower()
+            .str.replace(NON_ALNUM_RE.pattern, " ", regex=True)
+            .str.strip())
+
+
+def item_key(desc, code=None):
+    """Stable key of a catalog item.
+
+    The item code from the schedule, as ``#<code>``, when the item has one,
+    so correcting a description does not break saved BOQs; otherwise
+    ``normalize`` of the description.
+    """
+    code = "" if code is None or pd.isna(code) else str(code).strip()
+    if code:
+        return f"#{code}"
+    return NON_ALNUM_RE.sub(" ", str(desc).lower()).strip()
+
+
+def read_takeoff(source, name=""):
+    """Read a take-off from a CSV file or the first sheet of a workbook."""
+    if str(name).lower().endswith(".csv"):
+        return pd.read_csv(source)
+    return pd.read_excel(source)
+
+
+def takeoff_columns(takeoff):
+    """The (description, quantity) columns of a take-off, by name or else position."""
+    names = {str(col).strip().lower(): col for col in takeoff.columns}
+    desc = next((names[n] for n in DESCRIPTION_NAMES if n in names), None)
+    qty = next((names[n] for n in QUANTITY_NAMES if n in names), None)
+    if desc is None or qty is None:
+        if takeoff.shape[1] < 2:
+            raise ValueError("❌ Take-off needs a description column and a quantity column")
+        desc = desc if desc is not None else takeoff.columns[0]
+        qty = qty if qty is not None else next(c for c in takeoff.columns if c != desc)
+    return desc, qty
+
+
+def price_takeoff(takeoff, items):
+    """Price every take-off line against the catalog ``items``.
+
+    ``items`` is the catalog as returned by ``load_all_items`` (dicts or a
+    frame with ``desc``, ``unit``, ``rate`` and optionally ``sheet`` and
+    ``code``).
+    Returns a ``PricingResult`` with the priced lines, the unmatched lines
+    and the number of lines in each outcome (``code``, ``exact``,
+    ``normalized`` and ``unmatched``).
+    """
+    catalog = pd.DataFrame(items)
+    if "sheet" not in catalog:
+        catalog["sheet"] = None
+    catalog["Item Key"] = [item_key(desc, code) for desc, code in
+                           zip(catalog["desc"], catalog["code"] if "code" in catalog else [None] * len(catalog))]
+    catalog = catalog[["desc", "unit", "rate", "sheet", "Item Key"]].rename(
+        columns={"desc": "Item Name", "unit": "Unit", "rate": "Unit Price", "sheet": "Category"})
+
+    desc_col, qty_col = takeoff_columns(takeoff)
+    lines = pd.DataFrame({
+        # line numbers as in the uploaded sheet: the header is row 1
+        "Line": pd.RangeIndex(2, len(takeoff) + 2),
+        "Take-off Description": takeoff[desc_col].fillna("").astype(str).str.strip(),
+        "Quantity": pd.to_numeric(takeoff[qty_col], errors="coerce").astype(float),
+    })
+    blank = lines["Take-off Description"].eq("")
+    # wholly empty rows are spacing in the sheet, not take-off lines
+    lines = lines[~(blank & takeoff[qty_col].isna().to_numpy())]
+    blank = lines["Take-off Description"].eq("")
+    bad_qty = lines["Quantity"].isna() & ~blank
+    valid = lines[~(bad_qty | blank)]
+
+    # a column of item codes matches the catalog's code keys first
+    by_code = None
+    if str(desc_col).strip().lower() in CODE_NAMES:
+        codes = item_codes(takeoff[desc_col]).to_numpy()[valid["Line"].to_numpy() - 2]
+        keyed = valid.assign(Key=[item_key(None, code) for code in codes])
+        by_code = keyed.merge(catalog.drop_duplicates("Item Key"), how="left", left_on="Key",
+                              right_on="Item Key").drop(columns="Key")
+        valid = valid[by_code["Item Name"].isna().to_numpy()]
+        by_code = by_code[by_code["Item Name"].notna()]
+
+    # same first-wins rule for duplicate descriptions as the search index
+    exact = valid.merge(catalog.drop_duplicates("Item Name"), how="left",
+                                  left_on="Take-off Description", right_on="Item Name")
+    exact_hit = exact["Item Name"].notna()
+
+    catalog["Key"] = normalize(catalog["Item Name"])
+    rest = exact.loc[~exact_hit, ["Line", "Take-off Description", "Quantity"]]
+    rest = rest.assign(Key=normalize(rest["Take-off Description"]))
+    fuzzy = rest.merge(catalog.drop_duplicates("Key"), how="left", on="Key").drop(columns="Key")
+    fuzzy_hit = fuzzy["Item Name"].notna()
+
+    priced = [exact[exact_hit].assign(Match="exact"), fuzzy[fuzzy_hit].assign(Match="normalized")]
+    if by_code is not None:
+        priced.insert(0, by_code.assign(Match="code"))
+    priced = pd.concat(priced)
+    priced["Total"] = priced["Quantity"] * priced["Unit Price"]
+    priced = priced.sort_values("Line", kind="stable")[PRICED_COLUMNS].reset_index(drop=True)
+
+    unmatched = pd.concat([
+        lines[blank].assign(Reason="description is blank"),
+        lines[bad_qty].assign(Reason="quantity is not a number"),
+        fuzzy.loc[~fuzzy_hit, ["Line", "Take-off Description", "Quantity"]].assign(Reason="no matching item"),
+    ])
+    unmatched = unmatched.sort_values("Line", kind="stable")[UNMATCHED_COLUMNS].reset_index(drop=True)
+
+    counts = {
+        "code": 0 if by_code is None else int(len(by_code)),
+        "exact": int(exact_hit.sum()),
+        "normalized": int(fuzzy_hit.sum()),
+        "unmatched": int(len(unmatched)),
+    }
+    return PricingResult(priced, unmatched, counts)
+
+
+def boq_lines(priced):
+    """Priced lines combined per catalog item, ready to add to the BOQ."""
+    return (priced.groupby("Item Name", sort=False, dropna=False)
+            .agg({"Quantity": "sum", "Unit": "first", "Unit Price": "first", "Category": "first",
+                  "Item Key": "first"})
+            .reset_index())
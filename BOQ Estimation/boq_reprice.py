@@ -0,0 +1,146 @@
+"""Reprice saved BOQs against a revised item schedule.
+
+Rate deltas between the old and new schedule are computed once, keyed by
+the stable item key saved with every BOQ line.  All saved BOQs are then
+loaded into one table of lines and joined against the changed items only,
+so lines whose item kept its rate are never touched.  The result is a
+per-project variance report and, optionally, the repriced BOQs.
+
+Usage:
+    python boq_reprice.py item_schedule_2024.xlsx item_schedule_2025.xlsx saved/*.json \
+        --out variance.csv --lines repriced_lines.csv --write-dir repriced/
+"""
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from boq_pricing import item_key, normalize
+from rate_catalog import content_hash, load_catalog
+
+REPORT_COLUMNS = ["Project", "File", "Lines", "Repriced Lines", "Removed Items", "Old Total", "New Total",
+                  "Variance", "Variance %"]
+
+
+def catalog_rates(items):
+    """Catalog items as a frame keyed by item key (first item wins for duplicate keys).
+
+    Items with a code are listed under their code key and again under their
+    description key, so lines saved before the schedule had codes still match.
+    """
+    catalog = pd.DataFrame(items, columns=["desc", "unit", "rate", "code"])
+    catalog["key"] = normalize(catalog["desc"])
+    by_code = catalog.assign(key=[item_key(desc, code) for desc, code in zip(catalog["desc"], catalog["code"])])
+    by_code = by_code[by_code["key"].str.startswith("#")]
+    return pd.concat([by_code, catalog]).drop_duplicates("key").set_index("key")
+
+
+def rate_deltas(old_items, new_items):
+    """Items whose rate changed, or that were removed or added, between two catalogs.
+
+    Returns a frame indexed by item key with ``Old Rate``, ``New Rate``,
+    ``Delta`` and ``Status`` (``changed``, ``removed`` or ``added``).
+    """
+    old, new = catalog_rates(old_items)["rate"], catalog_rates(new_items)["rate"]
+    rates = pd.concat({"Old Rate": old, "New Rate": new}, axis=1)
+    rates["Delta"] = rates["New Rate"] - rates["Old Rate"]
+    rates["Status"] = np.select(
+        [rates["New Rate"].isna(), rates["Old Rate"].isna(), rates["Delta"] != 0],
+        ["removed", "added", "changed"], default="",
+    )
+    return rates[rates["Status"] != ""]
+
+
+def load_saved_boqs(paths):
+    """Every line of the saved BOQs in ``paths`` as one frame."""
+    columns = ["project", "file", "sr", "key", "name", "quantity", "unit", "unit_price", "category"]
+    records = []
+    for path in paths:
+        doc = json.loads(Path(path).read_text(encoding="utf-8"))
+        project = doc.get("project") or Path(path).stem
+        for line in doc["lines"]:
+            # BOQs saved before lines carried a key fall back to the item name
+            key = line.get("key") or item_key(line["name"])
+            records.append((project, str(path), line["sr"], key, line["name"], line["quantity"], line["unit"],
+                            line["unit_price"], line.get("category")))
+    return pd.DataFrame.from_records(records, columns=columns)
+
+
+def reprice(lines, deltas):
+    """Reprice ``lines`` (from ``load_saved_boqs``) with the catalog ``deltas``.
+
+    Returns ``(repriced, report)``: the touched lines with old and new
+    prices, and the per-project variance report.  Lines whose item was
+    removed from the catalog keep their price and are counted separately.
+    """
+    touched = lines.merge(deltas[deltas["Status"] != "added"], how="inner", left_on="key", right_index=True)
+    removed = touched["Status"] == "removed"
+    touched["New Price"] = touched["New Rate"].where(~removed, touched["unit_price"])
+    touched["Old Total"] = touched["quantity"] * touched["unit_price"]
+    touched["New Total"] = touched["quantity"] * touched["New Price"]
+    touched["Variance"] = touched["New Total"] - touched["Old Total"]
+
+    totals = lines.assign(total=lines["quantity"] * lines["unit_price"]).groupby(["project", "file"], sort=False)
+    report = totals.agg(**{"Lines": ("sr", "size"), "Old Total": ("total", "sum")})
+    counts = pd.DataFrame({"Repriced Lines": touched["Status"] == "changed", "Removed Items": removed,
+                           "Variance": touched["Variance"], "project": touched["project"], "file": touched["file"]})
+    report = report.join(counts.groupby(["project", "file"], sort=False).sum())
+    report = report.fillna({"Repriced Lines": 0, "Removed Items": 0, "Variance": 0.0})
+    report["New Total"] = report["Old Total"] + report["Variance"]
+    old_total = report["Old Total"].where(report["Old Total"] != 0)
+    report["Variance %"] = (100 * report["Variance"] / old_total).fillna(0.0)
+    report = report.reset_index().rename(columns={"project": "Project", "file": "File"})
+    report = report.astype({"Repriced Lines": int, "Removed Items": int})[REPORT_COLUMNS]
+
+    repriced = touched.rename(columns={"project": "Project", "file": "File", "sr": "Sr#", "name": "Item Name",
+                                       "quantity": "Quantity", "unit_price": "Old Price"})
+    repriced = repriced[["Project", "File", "Sr#", "Item Name", "Quantity", "Old Price", "New Price",
+                         "Old Total", "New Total", "Variance", "Status"]]
+    return repriced.reset_index(drop=True), report
+
+
+def write_repriced(repriced, catalog, out_dir):
+    """Write a copy of every repriced BOQ to ``out_dir`` with the new prices."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    changed = repriced[repriced["Status"] == "changed"]
+    for path, group in changed.groupby("File", sort=False):
+        new_price = dict(zip(group["Sr#"], group["New Price"]))
+        doc = json.loads(Path(path).read_text(encoding="utf-8"))
+        for line in doc["lines"]:
+            line["unit_price"] = float(new_price.get(line["sr"], line["unit_price"]))
+        doc["catalog"] = catalog
+        (out_dir / Path(path).name).write_text(json.dumps(doc, indent=1), encoding="utf-8")
+    return changed["File"].nunique()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reprice saved BOQs against a revised item schedule.")
+    parser.add_argument("old_schedule", help="item schedule the BOQs were priced from")
+    parser.add_argument("new_schedule", help="revised item schedule")
+    parser.add_argument("boqs", nargs="+", help="saved BOQ .json files")
+    parser.add_argument("--out", default="boq_variance.csv", help="per-project variance report (CSV)")
+    parser.add_argument("--lines", help="optional CSV of every repriced line")
+    parser.add_argument("--write-dir", help="write repriced copies of the BOQs to this directory")
+    args = parser.parse_args(argv)
+
+    old_data, new_data = Path(args.old_schedule).read_bytes(), Path(args.new_schedule).read_bytes()
+    deltas = rate_deltas(load_catalog(old_data).items(), load_catalog(new_data).items())
+    lines = load_saved_boqs(args.boqs)
+    repriced, report = reprice(lines, deltas)
+
+    report.round(2).to_csv(args.out, index=False)
+    if args.lines:
+        repriced.round(2).to_csv(args.lines, index=False)
+    print(f"{(deltas['Status'] == 'changed').sum()} items changed rate; "
+          f"{len(repriced)} of {len(lines)} lines across {len(report)} BOQs affected -> {args.out}")
+    print(f"Total variance: Rs. {report['Variance'].sum():,.2f}")
+    if args.write_dir:
+        n = write_repriced(repriced, content_hash(new_data), args.write_dir)
+        print(f"Wrote {n} repriced BOQs to {args.write_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Keyed store for the lines of a BOQ being estimated.
+
+Lines are keyed by item name, so adding, updating and deleting a line are
+dict operations instead of scans over a list.  Each line keeps the Sr#
+it was given when first added.  The grand total and per-category subtotals
+are adjusted on every change rather than re-summed; they are kept as exact
+fractions, so any number of updates adds no rounding drift.  The table view
+is rebuilt only after the lines change.
+
+A BOQ is saved as JSON in which every line refers to its catalog item by
+key, so saved BOQs can be repriced when the item schedule is revised (see
+``boq_reprice.py``).
+"""
+import json
+from datetime import datetime
+from fractions import Fraction
+
+LINE_COLUMNS = ["Item Name", "Quantity", "Unit", "Unit Price", "Total"]
+
+SAVE_FORMAT = 1
+
+
+class BOQStore:
+    """BOQ lines keyed by item name, with running totals."""
+
+    def __init__(self):
+        self._lines = {}      # item name -> line dict, in insertion order
+        self._by_sr = {}      # Sr# -> item name
+        self._next_sr = 1
+        self._total = Fraction(0)
+        self._subtotals = {}  # category -> [Fraction total, line count]
+        self._frame = None
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __contains__(self, name):
+        return name in self._lines
+
+    def get(self, name):
+        return self._lines.get(name)
+
+    def upsert(self, name, quantity, unit, unit_price, category=None, key=None):
+        """Add a line, or update the line for ``name``; returns True if it was added."""
+        old = self._lines.get(name)
+        if old is not None:
+            self._remove(old)
+            sr = old["Sr#"]
+        else:
+            sr = self._next_sr
+            self._next_sr += 1
+            self._by_sr[sr] = name
+
+        line = {
+            "Sr#": sr,
+            "Item Name": name,
+            "Quantity": quantity,
+            "Unit": unit,
+            "Unit Price": unit_price,
+            "Total": quantity * unit_price,
+            "Category": category,
+            "Item Key": key,
+        }
+        self._lines[name] = line
+        self._add(line)
+        self._frame = None
+        return old is None
+
+    def delete(self, name):
+        line = self._lines.pop(name, None)
+        if line is None:
+            return False
+        del self._by_sr[line["Sr#"]]
+        self._remove(line)
+        if not self._lines:
+            self._next_sr = 1
+        self._frame = None
+        return True
+
+    def delete_sr(self, sr):
+        name = self._by_sr.get(sr)
+        return self.delete(name) if name is not None else False
+
+    def serials(self):
+        return list(self._by_sr)
+
+    def _add(self, line):
+        amount = Fraction(line["Total"])
+        self._total += amount
+        entry = self._subtotals.setdefault(line["Category"], [Fraction(0), 0])
+        entry[0] += amount
+        entry[1] += 1
+
+    def _remove(self, line):
+        amount = Fraction(line["Total"])
+        self._total -= amount
+        entry = self._subtotals[line["Category"]]
+        entry[0] -= amount
+        entry[1] -= 1
+        if not entry[1]:
+            del self._subtotals[line["Category"]]
+
+    @property
+    def grand_total(self):
+        return float(self._total)
+
+    def subtotals(self):
+        """Total per category, in the order categories were first added."""
+        return {category: float(amount) for category, (amount, _) in self._subtotals.items()}
+
+    def to_json(self, project, catalog=None):
+        """The BOQ as a JSON document; ``catalog`` identifies the item schedule it was priced from."""
+        return json.dumps({
+            "format": SAVE_FORMAT,
+            "project": project,
+            "catalog": catalog,
+            "saved_at": datetime.now().isoformat(timespec="seconds"),
+            "lines": [
+                {"sr": line["Sr#"], "key": line["Item Key"], "name": line["Item Name"],
+                 "quantity": line["Quantity"], "unit": line["Unit"], "unit_price": line["Unit Price"],
+                 "category": line["Category"]}
+                for line in self._lines.values()
+            ],
+        }, indent=1)
+
+    @classmethod
+    def from_json(cls, text):
+        """Rebuild a BOQ saved with ``to_json``; returns ``(store, project)``."""
+        doc = json.loads(text)
+        store = cls()
+        for line in sorted(doc["lines"], key=lambda line: line["sr"]):
+            store._next_sr = line["sr"]
+            store.upsert(line["name"], line["quantity"], line["unit"], line["unit_price"],
+                         category=line.get("category"), key=line.get("key"))
+        return store, doc.get("project", "")
+
+    def frame(self):
+        """Lines as a DataFrame indexed by Sr#; reused until the lines change."""
+        if self._frame is None:
+            import pandas as pd  # only needed once the table is shown
+
+            df = pd.DataFrame(list(self._lines.values()), columns=["Sr#"] + LINE_COLUMNS)
+            self._frame = df.set_index("Sr#")
+        return self._frame
@@ -0,0 +1,144 @@
+"""Search index for the BOQ item catalog.
+
+Built once per catalog: token postings (token -> item ids), a trigram index
+over the token vocabulary for typo-tolerant matching, and a dict from
+description to item.  A query only touches the vocabulary entries it
+matches and the items on their posting lists, so search latency stays
+flat as the catalog grows.
+"""
+import bisect
+import re
+from collections import defaultdict
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.9
+FUZZY_SCORE = 0.8
+MIN_FUZZY_SIMILARITY = 0.4
+PHRASE_BONUS = 0.5
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ItemIndex:
+    """Ranked, typo-tolerant search over catalog item descriptions."""
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.descriptions = [item["desc"] for item in self.items]
+        self.by_desc = {}
+        for item in self.items:
+            self.by_desc.setdefault(item["desc"], item)
+        self._lowered = [d.lower() for d in self.descriptions]
+
+        postings = defaultdict(list)
+        for item_id, desc in enumerate(self.descriptions):
+            for token in set(tokenize(desc)):
+                postings[token].append(item_id)
+        self.postings = {token: np.array(ids, dtype=np.int64) for token, ids in postings.items()}
+        self.vocabulary = sorted(self.postings)
+
+        self._vocab_trigrams = {token: trigrams(token) for token in self.vocabulary}
+        gram_index = defaultdict(list)
+        for token, grams in self._vocab_trigrams.items():
+            for gram in grams:
+                gram_index[gram].append(token)
+        self.trigram_index = dict(gram_index)
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, desc):
+        return self.by_desc.get(desc)
+
+    def _matching_tokens(self, query_token):
+        """Vocabulary tokens matching ``query_token``, with their scores."""
+        matches = {}
+        if query_token in self.postings:
+            matches[query_token] = EXACT_SCORE
+
+        start = bisect.bisect_left(self.vocabulary, query_token)
+        for token in self.vocabulary[start:]:
+            if not token.startswith(query_token):
+                break
+            matches.setdefault(token, PREFIX_SCORE)
+
+        if len(query_token) >= 3:
+            grams = trigrams(query_token)
+            shared = defaultdict(int)
+            for gram in grams:
+                for token in self.trigram_index.get(gram, ()):
+                    shared[token] += 1
+            for token, common in shared.items():
+                # Dice coefficient of the two trigram sets
+                similarity = 2 * common / (len(grams) + len(self._vocab_trigrams[token]))
+                if similarity >= MIN_FUZZY_SIMILARITY:
+                    matches[token] = max(matches.get(token, 0.0), FUZZY_SCORE * similarity)
+        return matches
+
+    def search(self, query, top_k=50):
+        """Descriptions ranked by how well they match ``query``.
+
+        Items matching more query words rank first, then by match quality
+        (exact word, word prefix, then near-miss spellings), with a bonus if
+        the whole query appears verbatim.  An empty query returns every
+        description in catalog order.
+        """
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return list(self.descriptions)
+
+        # best score of every posting-list item, per query word
+        word_ids, word_scores = [], []
+        for query_token in dict.fromkeys(query_tokens):
+            matches = self._matching_tokens(query_token)
+            if matches:
+                ids, best = _best_per_item(
+                    [self.postings[token] for token in matches],
+                    [np.full(len(self.postings[token]), score) for token, score in matches.items()],
+                )
+                word_ids.append(ids)
+                word_scores.append(best)
+        if not word_ids:
+            return []
+
+        candidates, inverse = np.unique(np.concatenate(word_ids), return_inverse=True)
+        matched_words = np.bincount(inverse, minlength=len(candidates))
+        quality = np.bincount(inverse, weights=np.concatenate(word_scores), minlength=len(candidates))
+        scores = matched_words * len(query_tokens) + quality
+
+        # the phrase bonus can only lift items within PHRASE_BONUS of the top_k cut-off
+        if top_k and len(candidates) > top_k:
+            cutoff = np.partition(scores, len(scores) - top_k)[len(scores) - top_k]
+            near = np.flatnonzero(scores >= cutoff - PHRASE_BONUS)
+        else:
+            near = np.arange(len(candidates))
+        phrase = query.strip().lower()
+        scores = scores[near] + [PHRASE_BONUS if phrase in self._lowered[i] else 0.0 for i in candidates[near]]
+        candidates = candidates[near]
+
+        # highest score first; ties keep catalog order
+        order = np.lexsort((candidates, -scores))
+        if top_k:
+            order = order[:top_k]
+        return [self.descriptions[i] for i in candidates[order]]
+
+
+def _best_per_item(id_arrays, score_arrays):
+    """Unique item ids with the highest of their scores."""
+    ids, scores = np.concatenate(id_arrays), np.concatenate(score_arrays)
+    order = np.lexsort((-scores, ids))
+    ids, scores = ids[order], scores[order]
+    first = np.ones(len(ids), dtype=bool)
+    first[1:] = ids[1:] != ids[:-1]
+    return ids[first], scores[first]
@@ -0,0 +1,231 @@
+"""Rate catalog loading and on-disk compiled cache.
+
+Every sheet of the item schedule with at least three columns contributes
+items from its first three: description, unit and rate.  A column headed
+``code``, ``item code``, ``id`` or similar is read as the item code instead
+and may be anywhere in the sheet; items keep a blank code without one.
+Parsing is done with column operations, and rows that cannot be used (blank
+cells, a rate that is not a number) are reported instead of dropped silently.
+
+The parsed catalog is compiled to a single ``.npz`` file keyed by the
+SHA-256 of the workbook, as parallel arrays: descriptions as one UTF-8
+buffer with offsets (likewise item codes), units and sheets as codes into
+small lookup tables, and rates as float64.  A server restart or a new worker loads that file
+instead of re-parsing the workbook.
+
+Settings (environment variables):
+    BOQ_CACHE_DIR          cache directory (default: ~/.cache/boq_estimation)
+    BOQ_CACHE_MAX_ENTRIES  compiled catalogs kept (default: 32)
+"""
+import hashlib
+import io
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "boq_estimation"
+DEFAULT_MAX_ENTRIES = 32
+
+# bump when the compiled layout changes so old entries are not read
+FORMAT_VERSION = 2
+
+REJECTED_COLUMNS = ["Sheet", "Row", "Reason"]
+
+# headers (any case) of an optional item code column
+CODE_NAMES = ("code", "item code", "item no", "item no.", "id", "item id", "row id")
+
+
+def cache_dir():
+    """Where compiled catalogs live; ``BOQ_CACHE_DIR`` overrides the default."""
+    return Path(os.environ.get("BOQ_CACHE_DIR", DEFAULT_CACHE_DIR))
+
+
+def max_cache_entries():
+    """How many compiled catalogs to keep; ``BOQ_CACHE_MAX_ENTRIES`` overrides the default."""
+    return int(os.environ.get("BOQ_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+
+
+def content_hash(data):
+    """Hex SHA-256 of a workbook's bytes: the compiled catalog's name, and the catalog a saved project records."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class RateCatalog:
+    """Catalog items as parallel arrays, plus the rows that were rejected."""
+
+    def __init__(self, desc, unit, rate, sheet, rejected=None, code=None):
+        self.desc = list(desc)
+        self.unit = list(unit)
+        self.rate = np.asarray(rate, dtype=float)
+        self.sheet = list(sheet)
+        self.code = list(code) if code is not None else [""] * len(self.desc)
+        self.rejected = rejected if rejected is not None else pd.DataFrame(columns=REJECTED_COLUMNS)
+
+    def __len__(self):
+        return len(self.desc)
+
+    def items(self):
+        """Items as ``{"desc", "unit", "rate", "sheet", "code"}`` dicts, in workbook order."""
+        return [
+            {"desc": d, "unit": u, "rate": r, "sheet": s, "code": c}
+            for d, u, r, s, c in zip(self.desc, self.unit, self.rate.tolist(), self.sheet, self.code)
+        ]
+
+    def to_frame(self):
+        return pd.DataFrame({"desc": self.desc, "unit": self.unit, "rate": self.rate, "sheet": self.sheet,
+                             "code": self.code})
+
+
+# ---------- Parsing ----------
+def parse_catalog(source):
+    """Parse every sheet of the item schedule into a ``RateCatalog``."""
+    sheets = pd.read_excel(source, sheet_name=None)
+    frames, rejected = [], []
+    for sheet, df in sheets.items():
+        code_col = next((c for c in df.columns if str(c).strip().lower() in CODE_NAMES), None)
+        codes = item_codes(df.pop(code_col)) if code_col is not None else pd.Series("", index=df.index)
+        if df.shape[1] < 3:
+            rejected.append(pd.DataFrame({"Sheet": [sheet], "Row": [pd.NA],
+                                          "Reason": ["fewer than 3 columns"]}))
+            continue
+        # rows as numbered in Excel: the header is row 1
+        rows = pd.Series(df.index + 2, index=df.index)
+        blank = df.isna().all(axis=1)
+        incomplete = df.isna().any(axis=1) & ~blank
+        rate = pd.to_numeric(df.iloc[:, 2], errors="coerce")
+        bad_rate = rate.isna() & ~blank & ~incomplete
+
+        reason = np.select([incomplete, bad_rate], ["missing value", "rate is not a number"], "")
+        bad = incomplete | bad_rate
+        if bad.any():
+            rejected.append(pd.DataFrame({"Sheet": sheet, "Row": rows[bad], "Reason": reason[bad.to_numpy()]}))
+
+        keep = ~(blank | bad)
+        frames.append(pd.DataFrame({
+            "desc": df.iloc[:, 0][keep].astype(str).str.strip(),
+            "unit": df.iloc[:, 1][keep].astype(str).str.strip(),
+            "rate": rate[keep].astype(float),
+            "sheet": sheet,
+            "code": codes[keep],
+        }))
+
+    items = (pd.concat(frames, ignore_index=True) if frames
+             else pd.DataFrame(columns=["desc", "unit", "rate", "sheet", "code"]))
+    report = (pd.concat(rejected, ignore_index=True) if rejected
+              else pd.DataFrame(columns=REJECTED_COLUMNS))
+    return RateCatalog(items["desc"], items["unit"], items["rate"], items["sheet"], report.astype({"Row": "Int64"}),
+                       items["code"])
+
+
+def item_codes(values):
+    """Item codes as text: blank cells as ``""``, whole numbers read as floats without ``.0``."""
+    return values.map(lambda c: "" if pd.isna(c)
+                      else str(int(c)) if isinstance(c, float) and c.is_integer()
+                      else str(c).strip())
+
+
+# ---------- Compiled Cache ----------
+def load_catalog(data, root=None, max_entries=None):
+    """Return the ``RateCatalog`` for the workbook bytes ``data``.
+
+    If this workbook was compiled before, its arrays are read back.
+    Otherwise the workbook is parsed and compiled, and the cache is trimmed to
+    the ``max_entries`` catalogs used last.
+    """
+    root = Path(root or cache_dir())
+    path = root / f"{content_hash(data)}.v{FORMAT_VERSION}.npz"
+    if path.exists():
+        try:
+            catalog = _read_compiled(path)
+        except (OSError, ValueError, KeyError):
+            path.unlink(missing_ok=True)
+        else:
+            now = time.time()
+            os.utime(path, (now, now))  # eviction goes by mtime, so a read counts as a use
+            return catalog
+
+    catalog = parse_catalog(io.BytesIO(data))
+    try:
+        _write_compiled(root, path, catalog)
+    except OSError:
+        pass  # unwritable cache dir: serve the parsed catalog uncached
+    else:
+        evict(root, max_entries if max_entries is not None else max_cache_entries(), keep=path)
+    return catalog
+
+
+def _encode_strings(values):
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_strings(buffer, offsets):
+    raw = buffer.tobytes()
+    bounds = offsets.tolist()
+    return [raw[a:b].decode("utf-8") for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def _write_compiled(root, path, catalog):
+    root.mkdir(parents=True, exist_ok=True)
+    desc_buffer, desc_offsets = _encode_strings(catalog.desc)
+    code_buffer, code_offsets = _encode_strings(catalog.code)
+    unit_codes, units = pd.factorize(pd.Series(catalog.unit, dtype=object))
+    sheet_codes, sheets = pd.factorize(pd.Series(catalog.sheet, dtype=object))
+    rejected = catalog.rejected
+    fd, tmp = tempfile.mkstemp(dir=root, prefix=".tmp-", suffix=".npz")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            np.savez(
+                fh,
+                desc_buffer=desc_buffer,
+                desc_offsets=desc_offsets,
+                code_buffer=code_buffer,
+                code_offsets=code_offsets,
+                unit_codes=unit_codes.astype(np.int32),
+                units=np.array(list(units), dtype=str),
+                sheet_codes=sheet_codes.astype(np.int32),
+                sheets=np.array(list(sheets), dtype=str),
+                rate=catalog.rate,
+                rejected_sheet=rejected["Sheet"].to_numpy(dtype=str),
+                rejected_row=rejected["Row"].fillna(0).to_numpy(dtype=np.int64),
+                rejected_reason=rejected["Reason"].to_numpy(dtype=str),
+            )
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _read_compiled(path):
+    with np.load(path, allow_pickle=False) as npz:
+        units, sheets = npz["units"].tolist(), npz["sheets"].tolist()
+        rejected = pd.DataFrame({
+            "Sheet": npz["rejected_sheet"].tolist(),
+            "Row": pd.array(npz["rejected_row"], dtype="Int64"),
+            "Reason": npz["rejected_reason"].tolist(),
+        })
+        rejected.loc[rejected["Row"] == 0, "Row"] = pd.NA
+        return RateCatalog(
+            _decode_strings(npz["desc_buffer"], npz["desc_offsets"]),
+            [units[c] for c in npz["unit_codes"].tolist()],
+            npz["rate"],
+            [sheets[c] for c in npz["sheet_codes"].tolist()],
+            rejected,
+            _decode_strings(npz["code_buffer"], npz["code_offsets"]),
+        )
+
+
+def evict(root, max_entries, keep=None):
+    """Delete all but the ``max_entries`` most recently used compiled catalogs."""
+    entries = [p for p in Path(root).glob("*.npz") if not p.name.startswith(".")]
+    entries.sort(key=lambda p: p.stat().st_mtime, reverse=True)
+    stale = [p for p in entries if p != keep][max(max_entries - 1, 0):]
+    for path in stale:
+        path.unlink(missing_ok=True)
+    return len(entries) - len(stale)
@@ -0,0 +1,47 @@
+"""Tests of bulk take-off pricing."""
+import pandas as pd
+
+from boq_pricing import boq_lines, price_takeoff
+
+ITEMS = [
+    {"desc": "Brick Masonry", "unit": "m³", "rate": 850.0, "sheet": "Civil Works", "code": "C-001"},
+    {"desc": "Cement Plastering", "unit": "m²", "rate": 120.0, "sheet": "Civil Works", "code": "C-002"},
+    {"desc": "Ceiling Fan", "unit": "no", "rate": 9000.0, "sheet": "Electrical Works", "code": ""},
+]
+
+
+def test_code_column_matches_catalog_codes():
+    takeoff = pd.DataFrame({"Item Code": ["C-001", "C-002", "C-404"], "Qty": [2, 3.5, 1]})
+    result = price_takeoff(takeoff, ITEMS)
+
+    assert result.counts == {"code": 2, "exact": 0, "normalized": 0, "unmatched": 1}
+    assert result.priced["Item Name"].tolist() == ["Brick Masonry", "Cement Plastering"]
+    assert result.priced["Match"].tolist() == ["code", "code"]
+    assert result.priced["Item Key"].tolist() == ["#C-001", "#C-002"]
+    assert result.priced["Total"].tolist() == [1700.0, 420.0]
+    assert result.unmatched[["Line", "Reason"]].values.tolist() == [[4, "no matching item"]]
+
+
+def test_numeric_codes_read_as_floats_match():
+    items = [dict(ITEMS[0], code="101")]
+    takeoff = pd.DataFrame({"code": [101.0, None], "qty": [1, None]})
+    result = price_takeoff(takeoff, items)
+
+    assert result.counts["code"] == 1
+    assert result.priced["Item Name"].tolist() == ["Brick Masonry"]
+
+
+def test_code_column_falls_back_to_descriptions():
+    takeoff = pd.DataFrame({"code": ["C-001", "Ceiling Fan", "ceiling  fan"], "qty": [1, 2, 3]})
+    result = price_takeoff(takeoff, ITEMS)
+
+    assert result.counts == {"code": 1, "exact": 1, "normalized": 1, "unmatched": 0}
+    lines = boq_lines(result.priced)
+    assert lines.set_index("Item Name")["Quantity"].to_dict() == {"Brick Masonry": 1.0, "Ceiling Fan": 5.0}
+
+
+def test_description_column_does_not_use_codes():
+    takeoff = pd.DataFrame({"description": ["C-001", "Brick Masonry"], "quantity": [1, 1]})
+    result = price_takeoff(takeoff, ITEMS)
+
+    assert result.counts == {"code": 0, "exact": 1, "normalized": 0, "unmatched": 1}
@@ -0,0 +1,144 @@
+"""Stage-by-stage benchmark of the billing pipeline.
+
+For each workbook size a synthetic workbook is generated (and kept for
+later runs), then every stage of the Streamlit page is timed on its own:
+
+    parse        pd.read_excel of the uploaded workbook
+    detect       month detection from the column names
+    compute      units and bills for one bill month / FPA month
+    csv          CSV summary export
+    pdf          BillPDF rendering (limited to --pdf-limit departments)
+
+One JSON object per (size, stage) is appended to the results file, so
+successive releases can be compared with ``--baseline``.
+
+Usage:
+    python bench_billing.py --sizes 10 1000 100000 --out bench_results.jsonl
+    python bench_billing.py --sizes 10 1000 --baseline bench_results.jsonl
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from bill_pdf import write_bills
+from billing_engine import Tariff, bill_month, detect_months, load_readings
+from synthetic_readings import write_workbook
+
+DEFAULT_SIZES = [10, 1_000, 100_000, 1_000_000]
+DEFAULT_DATA_DIR = Path.home() / ".cache" / "electricity_billing" / "bench"
+REGRESSION_RATIO = 1.2
+NOISE_FLOOR_SECONDS = 0.05  # faster stages are reported but not compared
+
+BENCH_TARIFF = Tariff(t1=45.5, t2=38.2, fc_surcharge=0.43, qtr=3.23, fpa=1.8)
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=Path(__file__).parent, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def workbook_for(size, n_months, data_dir):
+    path = Path(data_dir) / f"readings_{size}_{n_months}m.xlsx"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        print(f"  generating {path.name} ...", flush=True)
+        write_workbook(path, size, n_months)
+    return path
+
+
+def timed(stages, name, fn, rows):
+    start = time.perf_counter()
+    result = fn()
+    stages.append({"stage": name, "seconds": time.perf_counter() - start, "rows": rows})
+    return result
+
+
+def bench_size(path, size, pdf_limit, pdf_workers):
+    stages = []
+    df = timed(stages, "parse", lambda: load_readings(path), size)
+    months = timed(stages, "detect", lambda: detect_months(df.columns), len(df.columns))
+    # bill the latest month, with the month before it as the FPA month
+    bill, fpa = months[-1], months[-2]
+    bills = timed(stages, "compute", lambda: bill_month(df, BENCH_TARIFF, bill, fpa, months=months), size)
+    display = bills.round(2)
+    timed(stages, "csv", lambda: display.to_csv(index=False).encode("utf-8"), size)
+    if pdf_limit:
+        subset = display.head(pdf_limit)
+        timed(stages, "pdf", lambda: write_bills(subset, bill, fpa, io.BytesIO(), workers=pdf_workers),
+              len(subset))
+    return stages
+
+
+def load_baseline(path):
+    best = {}
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            rec = json.loads(line)
+            key = (rec["departments"], rec["stage"], rec["rows"])
+            best[key] = min(best.get(key, np.inf), rec["seconds"])
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the billing pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="department counts")
+    parser.add_argument("--months", type=int, default=12, help="months per workbook (at least 3)")
+    parser.add_argument("--pdf-limit", type=int, default=1_000, help="departments rendered in the PDF stage (0 skips)")
+    parser.add_argument("--pdf-workers", type=int, default=1)
+    parser.add_argument("--data-dir", default=str(DEFAULT_DATA_DIR), help="where synthetic workbooks are kept")
+    parser.add_argument("--out", default="bench_results.jsonl", help="JSON lines results file (appended)")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    args = parser.parse_args()
+    if args.months < 3:
+        parser.error("--months must be at least 3")
+
+    run = {
+        "run_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "cpus": os.cpu_count(),
+    }
+    baseline = load_baseline(args.baseline) if args.baseline else {}
+    regressions = []
+
+    with open(args.out, "a", encoding="utf-8") as out:
+        for size in args.sizes:
+            print(f"{size} departments")
+            path = workbook_for(size, args.months, args.data_dir)
+            for stage in bench_size(path, size, args.pdf_limit, args.pdf_workers):
+                record = dict(run, departments=size, months=args.months, **stage)
+                out.write(json.dumps(record) + "\n")
+
+                line = f"  {stage['stage']:<8} {stage['seconds']:>10.3f}s"
+                previous = baseline.get((size, stage["stage"], stage["rows"]))
+                if previous and max(previous, stage["seconds"]) >= NOISE_FLOOR_SECONDS:
+                    ratio = stage["seconds"] / previous
+                    line += f"  x{ratio:.2f} vs baseline"
+                    if ratio > REGRESSION_RATIO:
+                        regressions.append((size, stage["stage"], ratio))
+                        line += "  <-- slower"
+                print(line)
+
+    print(f"Results appended to {args.out}")
+    if regressions:
+        print(f"{len(regressions)} stage(s) more than {REGRESSION_RATIO:.1f}x slower than the baseline")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark parallel rendering of department bill PDFs.
+
+Renders the same synthetic set of department bills with an increasing number
+of worker processes and reports the wall time, speedup and parallel
+efficiency for each worker count.
+
+Usage:
+    python bench_pdf.py --departments 3000 --mode zip
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from billing_engine import BILL_COLUMNS
+from bill_pdf import RENDER_MODES, write_bills
+
+
+def synthetic_bills(n_departments, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(0, 50_000, size=(n_departments, len(BILL_COLUMNS))).round(2)
+    df = pd.DataFrame(values, columns=BILL_COLUMNS)
+    df.insert(0, "Department", [f"Dept-{i:06d}" for i in range(n_departments)])
+    return df
+
+
+def worker_counts(max_workers):
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    return counts + [max_workers]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--departments", type=int, default=2000)
+    parser.add_argument("--mode", choices=RENDER_MODES, default="zip")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=1, help="best of N runs per worker count")
+    args = parser.parse_args()
+
+    df = synthetic_bills(args.departments)
+    print(f"Rendering {args.departments} department bills ({args.mode})")
+    print(f"{'workers':>8} {'seconds':>10} {'bills/s':>10} {'speedup':>8} {'efficiency':>10}")
+
+    baseline = None
+    for workers in worker_counts(args.max_workers):
+        best = float("inf")
+        for _ in range(args.repeat):
+            with tempfile.TemporaryFile() as out:
+                start = time.perf_counter()
+                write_bills(df, "Jul-24", "Jun-24", out, mode=args.mode, workers=workers)
+                best = min(best, time.perf_counter() - start)
+        baseline = baseline or best
+        speedup = baseline / best
+        print(f"{workers:>8} {best:>10.2f} {args.departments / best:>10.0f} {speedup:>8.2f} {speedup / workers:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Content-addressed cache of rendered department bill pages.
+
+Every department's bill is rendered as its own one-page PDF, without a page
+number, and kept in a bounded in-memory LRU cache keyed by a hash of what is
+printed on it: the department's row of bill values, the bill month and the
+FPA month.  A page's position is not part of the key, so re-issuing bills
+after a tariff toggle, a correction to a few departments or a department
+being added or removed only renders the pages whose numbers changed; the
+rest come from the cache.
+
+Pages are cached as the rendered PDF bytes, so the size limit counts what
+is actually held.  Output walks the rows in order, renders the pages that
+are missing as it reaches them, parses each page (``pdf_pages``) and copies
+it into the document with ``PdfPageWriter``, which draws the page's number
+where ``bill_pdf`` prints it.  Only a block of pages is held at a time, so a
+long run of bills streams to the output like ``bill_pdf.write_bills``.  ZIP
+output numbers every department's PDF as page 1.
+
+Settings (environment variables):
+    BILL_PAGE_CACHE_MAX_BYTES  cache size limit in bytes (default: 64 MB)
+"""
+import io
+import json
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from pypdf.generic import DictionaryObject, NameObject
+
+from bill_pdf import RENDER_MODES, department_filename, page_label, page_label_position, render_bills
+from pdf_pages import Overlay, PdfPageWriter, Ref, read_pages
+from reading_cache import content_hash, max_cache_bytes
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# rows looked up, rendered and written at a time
+BLOCK_PAGES = 1000
+
+# the footer's italic Arial, which fpdf writes as Helvetica-Oblique
+PAGE_NUMBER_FONT = Ref(DictionaryObject({
+    NameObject("/Type"): NameObject("/Font"),
+    NameObject("/Subtype"): NameObject("/Type1"),
+    NameObject("/BaseFont"): NameObject("/Helvetica-Oblique"),
+    NameObject("/Encoding"): NameObject("/WinAnsiEncoding"),
+}))
+
+
+def page_key(row, bill_month, fpa_month):
+    """Hash of everything rendered on a department's bill page."""
+    payload = json.dumps([sorted(row.items()), bill_month, fpa_month], default=str)
+    return content_hash(payload.encode("utf-8"))
+
+
+def _render_pages(task):
+    rows, bill_month, fpa_month = task
+    return [render_bills([row], bill_month, fpa_month, numbered=False) for row in rows]
+
+
+class BillPageCache:
+    """Bounded LRU cache of rendered bill pages, safe to share between Streamlit sessions."""
+
+    def __init__(self, max_bytes=None):
+        if max_bytes is None:
+            max_bytes = max_cache_bytes("BILL_PAGE_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)
+        self.max_bytes = max_bytes
+        self._pages = OrderedDict()  # key -> one-page PDF bytes
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._pages)
+
+    @property
+    def size(self):
+        return self._size
+
+    def get(self, key):
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is None:
+                return None
+            self._pages.move_to_end(key)
+            return entry
+
+    def put(self, key, data):
+        with self._lock:
+            old = self._pages.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._pages[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes and len(self._pages) > 1:
+                _, evicted = self._pages.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+            self._size = 0
+
+    def pages(self, rows, bill_month, fpa_month, workers=1):
+        """Yield ``(data, rendered)`` for every row, in row order.
+
+        ``data`` is the row's unnumbered one-page PDF and ``rendered`` is
+        ``True`` when it was not in the cache.  Rows are taken
+        ``BLOCK_PAGES`` at a time; with ``workers > 1`` a block's missing
+        pages are rendered by a process pool before the block is yielded.
+        """
+        pool = None
+        try:
+            for start in range(0, len(rows), BLOCK_PAGES):
+                block = rows[start:start + BLOCK_PAGES]
+                keys = [page_key(row, bill_month, fpa_month) for row in block]
+                pages = [self.get(key) for key in keys]
+                missing = [i for i, data in enumerate(pages) if data is None]
+
+                if workers > 1 and len(missing) > 1:
+                    if pool is None:
+                        pool = ProcessPoolExecutor(max_workers=workers)
+                    size = max(1, min(250, -(-len(missing) // (workers * 4))))
+                    tasks = [([block[i] for i in missing[at:at + size]], bill_month, fpa_month)
+                             for at in range(0, len(missing), size)]
+                    rendered = (data for shard in pool.map(_render_pages, tasks) for data in shard)
+                    for i, data in zip(missing, rendered):
+                        pages[i] = data
+                        self.put(keys[i], data)
+
+                missing = set(missing)
+                for i, (row, key, data) in enumerate(zip(block, keys, pages)):
+                    if data is None:  # rendered here, as the output reaches it
+                        data = _render_pages(([row], bill_month, fpa_month))[0]
+                        self.put(key, data)
+                    yield data, i in missing
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+
+# ---------- Output ----------
+def page_number(number):
+    """Overlay printing the footer label of page ``number``."""
+    x, y, size = page_label_position(number)
+    text = page_label(number).encode("latin-1")
+    ops = b"BT /FPageNo %.2f Tf %.2f %.2f Td (%s) Tj ET\n" % (size, x, y, text)
+    return Overlay(ops, {"/FPageNo": PAGE_NUMBER_FONT})
+
+
+def write_pages(fh, pages):
+    """Write ``pages`` (any iterable of ``PageParts``) to ``fh`` as one PDF, numbered from 1."""
+    writer = PdfPageWriter(fh)
+    for number, page in enumerate(pages, start=1):
+        writer.add_page(page, page_number(number))
+    if not len(writer):
+        raise ValueError("❌ No pages to write")
+    writer.close()
+
+
+def write_cached_bills(cache, df_display, bill_month, fpa_month, out, mode="merge", workers=1):
+    """``bill_pdf.write_bills`` served from ``cache``: only changed pages are rendered.
+
+    Returns the ``{"rendered", "reused"}`` page counts.
+    """
+    if mode not in RENDER_MODES:
+        raise ValueError(f"Unknown PDF render mode: {mode!r} (expected one of {RENDER_MODES})")
+
+    rows = df_display.to_dict("records")
+    if not rows:
+        raise ValueError("❌ No pages to write")
+    counts = {"rendered": 0, "reused": 0}
+
+    def parsed():
+        interned = {}  # the pages of one output share one copy of equal resources (fonts)
+        for data, rendered in cache.pages(rows, bill_month, fpa_month, workers=workers):
+            counts["rendered" if rendered else "reused"] += 1
+            yield read_pages(data, interned=interned)[0]
+
+    pages = parsed()
+    if mode == "zip":
+        with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for position, (row, page) in enumerate(zip(rows, pages)):
+                data = io.BytesIO()
+                write_pages(data, [page])
+                zf.writestr(department_filename(position, row["Department"]), data.getvalue())
+    elif isinstance(out, (str, os.PathLike)):
+        with open(out, "wb") as fh:
+            write_pages(fh, pages)
+    else:
+        write_pages(out, pages)
+    return counts
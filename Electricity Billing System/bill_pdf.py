@@ -0,0 +1,248 @@
+"""PDF rendering of department bills.
+
+Every department gets its own page.  Large runs are split into shards of
+departments that are rendered in a process pool and written to the output
+as they complete, either merged into one document or as a ZIP archive of
+per-department PDFs.  Merged shards are copied into the output page by
+page (``pdf_pages``) and deleted, so neither the rendered document nor a
+merge of it ever sits in memory whole.
+"""
+import functools
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from fpdf import FPDF
+
+from pdf_pages import PdfPageWriter, read_pages
+
+RENDER_MODES = ("merge", "zip")
+
+# page number cell: font, distance from the bottom edge and height (mm)
+FOOTER_FONT = ("Arial", "I", 8)
+FOOTER_BOTTOM, FOOTER_HEIGHT = 15, 10
+
+
+# --- Professional PDF Format ---
+class BillPDF(FPDF):
+    page_offset = 0
+    numbered = True  # False leaves the page number to be drawn later (bill_page_cache)
+
+    def header(self):
+        self.set_font("Arial", "B", 20)
+        self.cell(0, 10, "Electricity Bill", ln=True, align="C")
+        self.ln(3)
+        self.set_line_width(0.4)
+        self.line(10, self.get_y(), 200, self.get_y())
+        self.ln(5)
+
+    def footer(self):
+        if not self.numbered:
+            return
+        self.set_y(-FOOTER_BOTTOM)
+        self.set_font(*FOOTER_FONT)
+        self.cell(0, FOOTER_HEIGHT, page_label(self.page_no() + self.page_offset), align="C")
+
+    def add_section(self, title, fields):
+        self.set_font("Arial", "B", 12)
+        self.set_fill_color(220, 220, 220)
+        self.cell(0, 6, title, ln=True, fill=True)
+        self.set_font("Arial", "", 11)
+        for label, val in fields.items():
+            self.cell(110, 8, label, border=1)
+            self.cell(80, 8, val, border=1, ln=True, align="C")
+        self.ln(4)
+
+    def add_department_bill(self, row, bill_month, fpa_month):
+        self.add_page()
+
+        # Title Section: Department and Bill Month
+        self.set_font("Arial", "B", 14)
+        self.cell(0, 10, f"Department: {row['Department']}", ln=True)
+        self.set_font("Arial", "", 12)
+        self.cell(0, 8, f"Bill Month: {bill_month}", ln=True)
+        self.ln(2)
+
+        # T1 and T2 Units
+        self.add_section("T1 & T2 Units", {
+            "T1 Units": f"{row['T1 Units']:.2f}",
+            "T2 Units": f"{row['T2 Units']:.2f}",
+            "Total Units": f"{row['Total Units']:.2f}",
+        })
+
+        # Tariff Charges
+        self.add_section("Tariff Charges", {
+            "T1 Bill": f"Rs {row['T1 Bill']:,.2f}",
+            "T2 Bill": f"Rs {row['T2 Bill']:,.2f}",
+        })
+
+        # Surcharges
+        self.add_section("Surcharges", {
+            "FC Surcharge": f"Rs {row['FC Surcharge']:,.2f}",
+            "Qtr Tariff": f"Rs {row['Qtr Tariff']:,.2f}",
+        })
+
+        # Base Bill
+        self.add_section("Base Bill Summary", {
+            "Base Bill": f"Rs {row['Base Bill']:,.2f}",
+            "GST (18%)": f"Rs {row['GST (18%)']:,.2f}",
+            "Pre Total": f"Rs {row['Pre Total']:,.2f}",
+        })
+
+        # FPA Charges with selected FPA month in section title
+        self.add_section(f"FPA Charges ({fpa_month})", {
+            "FPA Charges": f"Rs {row['FPA Charges']:,.2f}",
+            "FPA GST (18%)": f"Rs {row['FPA GST (18%)']:,.2f}",
+            "Total FPA (with GST)": f"Rs {row['Total FPA (with GST)']:,.2f}",
+        })
+
+        # Total Bill
+        self.add_section("Total Payable", {
+            "Total Bill": f"Rs {row['Total Bill']:,.2f}",
+        })
+
+
+def page_label(number):
+    return f"Page {number}"
+
+
+@functools.lru_cache(maxsize=1)
+def _footer_pdf():
+    pdf = BillPDF()
+    pdf.set_font(*FOOTER_FONT)
+    return pdf
+
+
+def page_label_position(number):
+    """``(x, y, size)`` in points at which the footer prints the label of page ``number``.
+
+    ``x, y`` is the text origin from the bottom-left corner of the page and
+    ``size`` the font size, as ``BillPDF.footer`` would place it.
+    """
+    pdf = _footer_pdf()
+    width = pdf.w - pdf.l_margin - pdf.r_margin
+    x = pdf.l_margin + (width - pdf.get_string_width(page_label(number))) / 2
+    y = pdf.h - FOOTER_BOTTOM + FOOTER_HEIGHT / 2 + 0.3 * pdf.font_size
+    return x * pdf.k, (pdf.h - y) * pdf.k, pdf.font_size_pt
+
+
+def new_bill_pdf(page_offset=0, numbered=True):
+    pdf = BillPDF()
+    pdf.page_offset = page_offset
+    pdf.numbered = numbered
+    pdf.set_auto_page_break(auto=True, margin=15)
+    return pdf
+
+
+def pdf_bytes(pdf):
+    # fpdf 1.x returns a latin-1 str, fpdf2 returns a bytearray
+    data = pdf.output(dest="S")
+    return data.encode("latin-1") if isinstance(data, str) else bytes(data)
+
+
+def render_bills(rows, bill_month, fpa_month, page_offset=0, numbered=True):
+    """Render ``rows`` (dicts keyed by the display columns) into one PDF."""
+    pdf = new_bill_pdf(page_offset, numbered)
+    for row in rows:
+        pdf.add_department_bill(row, bill_month, fpa_month)
+    return pdf_bytes(pdf)
+
+
+def department_filename(position, department):
+    safe = re.sub(r"[^A-Za-z0-9_-]+", "_", str(department)).strip("_") or "department"
+    return f"{position + 1:05d}_{safe}.pdf"
+
+
+# ---------- Parallel Rendering ----------
+def _render_merge_shard(task):
+    rows, bill_month, fpa_month, first, tmp_dir = task
+    path = os.path.join(tmp_dir, f"shard_{first:08d}.pdf")
+    with open(path, "wb") as fh:
+        fh.write(render_bills(rows, bill_month, fpa_month, page_offset=first))
+    return path
+
+
+def _render_zip_shard(task):
+    rows, bill_month, fpa_month, first, _ = task
+    return [
+        (department_filename(first + i, row["Department"]), render_bills([row], bill_month, fpa_month))
+        for i, row in enumerate(rows)
+    ]
+
+
+def _shards(rows, shard_size):
+    for start in range(0, len(rows), shard_size):
+        yield start, rows[start:start + shard_size]
+
+
+def write_bills(df_display, bill_month, fpa_month, out, mode="merge", workers=None, shard_size=None):
+    """Render one bill page per department and stream the result to ``out``.
+
+    ``out`` is a path or a writable binary file object.  ``mode="merge"``
+    writes a single PDF (pages keep their running numbers), ``mode="zip"``
+    writes a ZIP of per-department PDFs.  ``workers`` defaults to the CPU
+    count; ``workers=1`` renders in-process.
+    """
+    if mode not in RENDER_MODES:
+        raise ValueError(f"Unknown PDF render mode: {mode!r} (expected one of {RENDER_MODES})")
+
+    rows = df_display.to_dict("records")
+    workers = max(1, workers or os.cpu_count() or 1)
+
+    if mode == "merge" and workers == 1:
+        _write_bytes(out, render_bills(rows, bill_month, fpa_month))
+        return
+
+    if shard_size is None:
+        # a few shards per worker keeps the pool busy without tiny tasks
+        shard_size = max(1, min(250, -(-len(rows) // (workers * 4))))
+
+    tmp_dir = tempfile.mkdtemp(prefix="bill_pdf_") if mode == "merge" else None
+    tasks = [(shard, bill_month, fpa_month, first, tmp_dir) for first, shard in _shards(rows, shard_size)]
+    render = _render_merge_shard if mode == "merge" else _render_zip_shard
+
+    try:
+        if workers == 1:
+            _write_results(map(render, tasks), out, mode)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                _write_results(pool.map(render, tasks), out, mode)
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _write_bytes(out, data):
+    if isinstance(out, (str, os.PathLike)):
+        with open(out, "wb") as fh:
+            fh.write(data)
+    else:
+        out.write(data)
+
+
+def _write_results(results, out, mode):
+    if mode == "zip":
+        with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for shard in results:
+                for name, data in shard:
+                    zf.writestr(name, data)
+        return
+
+    if isinstance(out, (str, os.PathLike)):
+        with open(out, "wb") as fh:
+            _merge_shards(results, fh)
+    else:
+        _merge_shards(results, out)
+
+
+def _merge_shards(paths, fh):
+    # each shard is copied into the output as soon as it is rendered, then removed
+    writer = PdfPageWriter(fh)
+    for path in paths:
+        for page in read_pages(path):
+            writer.add_page(page)
+        os.remove(path)
+    writer.close()
@@ -0,0 +1,203 @@
+"""Next-month bill projection for every department from its reading history.
+
+Monthly T1 and T2 units are taken from the reading cube (current minus
+previous reading), and every department's units are fitted with a linear
+trend plus, when there are enough months, one yearly harmonic (sine and
+cosine of the calendar month).  All departments share the same months, so
+they share one design matrix: the least-squares fit of every department and
+tariff slot is a single ``pinv(X) @ Y``.  Only departments with empty cells
+fall back to per-department normal equations, still solved as one batch.
+
+The projected units (and the ends of their prediction interval) go through
+``billing_engine.compute_bills``, so the projected ``Total Bill`` uses the
+same tariff, GST and FPA formulas as a real bill.  Every bill component
+increases with the units, so bills at the interval ends bound the bill; the
+bound is conservative because T1 and T2 errors are taken together.
+
+Usage:
+    python bill_projection.py Department_Meter_Readings_Jul24_Jun25.xlsx \
+        --t1 45.5 --t2 38.2 --fc-surcharge 0.43 --qtr 3.23 --fpa 1.8 --fpa-lag 1 \
+        --out projected_bills.csv
+"""
+from collections import namedtuple
+from datetime import datetime
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from billing_engine import (BILL_COLUMNS, ExactTotals, as_cube, build_parser, compute_bills, load_readings,
+                            tariff_from_args)
+from reading_cube import MONTH_FORMAT, parse_month
+
+INTERVAL_COLUMNS = ["Total Units Low", "Total Units High", "Total Bill Low", "Total Bill High"]
+
+# a yearly harmonic needs enough months to be told apart from the trend
+MIN_SEASONAL_MONTHS = 8
+MIN_MONTHS = 3
+
+Projection = namedtuple("Projection", ["month", "bills", "history_months"])
+
+
+def month_number(label):
+    dt = parse_month(label)
+    return dt.year * 12 + dt.month - 1
+
+
+def month_label(number):
+    return datetime(number // 12, number % 12 + 1, 1).strftime(MONTH_FORMAT)
+
+
+def monthly_units(cube):
+    """Ordinals, ``(departments, months, 2)`` units and validity of every month with previous readings.
+
+    Units are not valid where the current or previous reading cell is empty.
+    """
+    idx = np.array([i for i in range(1, len(cube.months)) if cube.has_previous(i) and cube.present[i].all()],
+                   dtype=int)
+    if len(idx) == 0:
+        return idx, np.zeros((len(cube), 0, 2)), np.zeros((len(cube), 0, 2), dtype=bool)
+    units, _ = cube.period_units(idx, idx)
+    valid = ~(cube.missing[:, idx] | cube.missing[:, idx - 1])
+    return idx, units, valid
+
+
+def design_matrix(numbers, origin, seasonal):
+    """Intercept, trend (months since ``origin``) and, if ``seasonal``, the yearly harmonic."""
+    numbers = np.asarray(numbers)
+    columns = [np.ones(len(numbers)), (numbers - origin).astype(float)]
+    if seasonal:
+        angle = 2 * np.pi * (numbers % 12) / 12
+        columns += [np.sin(angle), np.cos(angle)]
+    return np.column_stack(columns)
+
+
+def t_quantile(p, dof):
+    """Student-t quantile via the Cornish-Fisher expansion of the normal quantile.
+
+    Within 0.01 of the exact value for ``dof >= 3`` at the usual levels.
+    """
+    z = NormalDist().inv_cdf(p)
+    dof = np.asarray(dof, dtype=float)
+    return (z + (z ** 3 + z) / (4 * dof)
+            + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * dof ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * dof ** 3)
+            + (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / (92160 * dof ** 4))
+
+
+def fit_and_project(X, x0, Y, W, level=0.95):
+    """Project every column of ``Y`` (months x series) at the design row ``x0``.
+
+    ``W`` marks the valid observations.  Columns observed in every month
+    share ``pinv(X)``; the rest are solved from their own masked normal
+    equations in one batch.  Returns ``(point, half_width)`` of the
+    ``level`` prediction interval (NaN width without residual degrees of
+    freedom).
+    """
+    n, p = X.shape
+    Y = np.where(W, Y, 0.0)
+    coef = np.empty((p, Y.shape[1]))
+    leverage = np.empty(Y.shape[1])  # x0ᵀ (XᵀX)⁻¹ x0
+
+    full = W.all(axis=0)
+    if full.any():
+        gram_inv = np.linalg.pinv(X.T @ X)
+        coef[:, full] = gram_inv @ (X.T @ Y[:, full])
+        leverage[full] = x0 @ gram_inv @ x0
+    partial = ~full
+    if partial.any():
+        w = W[:, partial].astype(float)
+        gram_inv = np.linalg.pinv(np.einsum("nk,np,nq->kpq", w, X, X), hermitian=True)
+        coef[:, partial] = np.einsum("kpq,qk->pk", gram_inv, X.T @ (w * Y[:, partial]))
+        leverage[partial] = np.einsum("p,kpq,q->k", x0, gram_inv, x0)
+
+    residual = np.where(W, Y - X @ coef, 0.0)
+    dof = W.sum(axis=0) - p
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sigma = np.sqrt((residual ** 2).sum(axis=0) / np.where(dof > 0, dof, np.nan))
+        half = t_quantile(0.5 + level / 2, np.maximum(dof, 1)) * sigma * np.sqrt(1 + leverage)
+    return x0 @ coef, half
+
+
+def project_next_month(data, tariff, fpa_lag=0, level=0.95, seasonal=None, months=None, fpa_month=None):
+    """Projected bills of every department for the month after the last reading.
+
+    The FPA month is ``fpa_month`` (a label) or ``fpa_lag`` calendar months
+    before the projected month.  The FPA charge uses that month's actual
+    units, found by month in the workbook, or the projected units when it is
+    the projected month itself.  ``seasonal`` defaults to fitting the yearly harmonic when
+    there are at least ``MIN_SEASONAL_MONTHS`` months of units.  Returns a
+    ``Projection`` whose ``bills`` frame has ``Department``,
+    ``BILL_COLUMNS`` and ``INTERVAL_COLUMNS``.
+    """
+    cube = as_cube(data, months)
+    idx, units, valid = monthly_units(cube)
+    if len(idx) < MIN_MONTHS:
+        raise ValueError(f"❌ Need at least {MIN_MONTHS} months of units to project next month's bills")
+
+    numbers = np.array([month_number(cube.months[i]) for i in idx])
+    target = month_number(cube.months[-1]) + 1
+    fpa_number = month_number(fpa_month) if fpa_month else target - fpa_lag
+    if fpa_number > target:
+        raise ValueError(f"❌ The FPA month {month_label(fpa_number)} is after the projected month {month_label(target)}")
+    fpa_idx = None
+    if fpa_number < target:
+        # months may be skipped or wrap into a new year, so the lag is not an offset into cube.months
+        fpa_idx = {month_number(m): i for i, m in enumerate(cube.months)}.get(fpa_number)
+        if fpa_idx is None:
+            raise ValueError(f"❌ FPA month {month_label(fpa_number)} is not in the workbook")
+        if not cube.has_previous(fpa_idx):
+            raise ValueError(f"❌ Missing previous month reading for FPA: {cube.previous(cube.months[fpa_idx])}")
+    seasonal = len(idx) >= MIN_SEASONAL_MONTHS if seasonal is None else seasonal
+    X = design_matrix(numbers, numbers[0], seasonal)
+    x0 = design_matrix([target], numbers[0], seasonal)[0]
+
+    n_dept = len(cube)
+    Y = units.transpose(1, 0, 2).reshape(len(idx), n_dept * 2)
+    W = valid.transpose(1, 0, 2).reshape(len(idx), n_dept * 2)
+    point, half = fit_and_project(X, x0, Y, W, level)
+    point, half = point.reshape(n_dept, 2), np.nan_to_num(half.reshape(n_dept, 2), nan=0.0)
+    low, high = np.clip(point - half, 0, None), np.clip(point + half, 0, None)
+    point = np.clip(point, 0, None)
+
+    if fpa_idx is not None:
+        fpa_units = cube.period_units([fpa_idx], [fpa_idx])[0][:, 0].sum(axis=-1)
+        fpa = (fpa_units, fpa_units, fpa_units)
+    else:
+        fpa = (point.sum(axis=-1), low.sum(axis=-1), high.sum(axis=-1))
+
+    bills = compute_bills(point, fpa[0], tariff)
+    low_bills, high_bills = compute_bills(low, fpa[1], tariff), compute_bills(high, fpa[2], tariff)
+    out = pd.DataFrame({col: bills[col] for col in BILL_COLUMNS})
+    out.insert(0, "Department", cube.departments)
+    out["Total Units Low"], out["Total Units High"] = low_bills["Total Units"], high_bills["Total Units"]
+    out["Total Bill Low"], out["Total Bill High"] = low_bills["Total Bill"], high_bills["Total Bill"]
+    return Projection(month_label(target), out, [cube.months[i] for i in idx])
+
+
+def main(argv=None):
+    parser = build_parser()
+    parser.description = "Project next month's bill for every department."
+    parser.set_defaults(out="projected_bills.csv")
+    parser.add_argument("--level", type=float, default=0.95, help="prediction interval level")
+    parser.add_argument("--no-seasonal", action="store_true", help="fit the trend only")
+    args = parser.parse_args(argv)
+    if args.month or args.period_months != 1 or args.start or args.end or args.allow_missing_prev:
+        # the projected month follows the workbook's last month and is billed from fitted units
+        parser.error("--month, --period-months, --start, --end and --allow-missing-prev do not apply "
+                     "to a projection")
+
+    # --fpa-month (or --fpa-lag months before the projected month) is the FPA month
+    projection = project_next_month(load_readings(args.workbook), tariff_from_args(args), args.fpa_lag,
+                                    args.level, False if args.no_seasonal else None, fpa_month=args.fpa_month)
+    bills = projection.bills
+    bills.round(2).to_csv(args.out, index=False)
+    totals = ExactTotals(["Total Bill", "Total Bill Low", "Total Bill High"]).add(bills).totals()
+    print(f"Projected {projection.month} bills for {len(bills)} departments from "
+          f"{len(projection.history_months)} months of units -> {args.out}")
+    print(f"Projected Total Bill: Rs. {totals['Total Bill']:,.2f} "
+          f"(Rs. {totals['Total Bill Low']:,.2f} to Rs. {totals['Total Bill High']:,.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""Headless billing engine for the departmental electricity billing system.
+
+The meter workbook has one row per department and a pair of reading columns
+per month (``"<Mon-YY> T1"`` / ``"<Mon-YY> T2"``).  The engine loads those
+columns into a ``ReadingCube`` (department x month x tariff) and evaluates
+the IESCO bill formulas for every month or billing period at once, so the
+Streamlit page, the command line and batch jobs all share the same
+arithmetic.
+
+Usage:
+    python billing_engine.py Department_Meter_Readings_Jul24_Jun25.xlsx \
+        --t1 45.5 --t2 38.2 --fc-surcharge 0.43 --qtr 3.23 --fpa 1.8 \
+        --out iesco_bills_all_months.csv
+"""
+import argparse
+import math
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from reading_cube import ReadingCube, detect_months, reading_columns  # noqa: F401 (re-exported)
+
+GST_RATE = 0.18
+
+BILL_COLUMNS = [
+    "T1 Units", "T2 Units", "Total Units",
+    "T1 Bill", "T2 Bill", "FC Surcharge", "Qtr Tariff",
+    "Base Bill", "GST (18%)", "Pre Total",
+    "FPA Charges", "FPA GST (18%)", "Total FPA (with GST)",
+    "Total Bill",
+]
+
+
+@dataclass(frozen=True)
+class Tariff:
+    t1: float
+    t2: float
+    fc_surcharge: float = 0.0
+    qtr: float = 0.0
+    fpa: float = 0.0
+    apply_gst: bool = True
+    apply_fpa: bool = True
+    apply_fpa_gst: bool = True
+
+
+# ---------- Bill Formulas ----------
+def compute_bills(units, fpa_units, tariff):
+    """Evaluate the bill formulas element-wise.
+
+    ``units`` has the tariff slot on its last axis (T1, T2); ``fpa_units`` is
+    the total FPA units with the same leading shape.  Returns a dict of
+    arrays keyed by ``BILL_COLUMNS``.
+    """
+    t1_units = units[..., 0]
+    t2_units = units[..., 1]
+    bills = {"T1 Units": t1_units, "T2 Units": t2_units}
+    bills["Total Units"] = t1_units + t2_units
+    bills["T1 Bill"] = t1_units * tariff.t1
+    bills["T2 Bill"] = t2_units * tariff.t2
+    bills["FC Surcharge"] = bills["Total Units"] * tariff.fc_surcharge
+    bills["Qtr Tariff"] = bills["Total Units"] * tariff.qtr
+    bills["Base Bill"] = bills["T1 Bill"] + bills["T2 Bill"] + bills["FC Surcharge"] + bills["Qtr Tariff"]
+
+    zeros = np.zeros_like(t1_units)
+    bills["GST (18%)"] = bills["Base Bill"] * GST_RATE if tariff.apply_gst else zeros
+    bills["Pre Total"] = bills["Base Bill"] + bills["GST (18%)"]
+
+    bills["FPA Charges"] = fpa_units * tariff.fpa if tariff.apply_fpa else zeros
+    bills["FPA GST (18%)"] = (
+        bills["FPA Charges"] * GST_RATE if (tariff.apply_fpa and tariff.apply_fpa_gst) else zeros
+    )
+    bills["Total FPA (with GST)"] = bills["FPA Charges"] + bills["FPA GST (18%)"]
+    bills["Total Bill"] = bills["Pre Total"] + bills["Total FPA (with GST)"]
+    return bills
+
+
+# ---------- Billing Entry Points ----------
+def load_readings(source):
+    df = pd.read_excel(source)
+    df.columns = df.columns.str.strip()
+    return df
+
+
+def as_cube(data, months=None):
+    return data if isinstance(data, ReadingCube) else ReadingCube.from_frame(data, months)
+
+
+def period_bills(cube, tariff, starts, ends, fpa_starts, fpa_ends,
+                 allow_missing_prev_bill=False, allow_missing_prev_fpa=False):
+    """Bill every department for each ``starts[i]``..``ends[i]`` period.
+
+    All arguments after ``tariff`` are month-ordinal arrays of equal length;
+    the FPA charge of period ``i`` comes from ``fpa_starts[i]``..``fpa_ends[i]``.
+    Returns the bill arrays, shaped ``(departments, periods)``, and a
+    ``(periods,)`` mask of the periods that have their previous readings.
+    """
+    units, billable = cube.period_units(starts, ends, allow_missing_prev_bill)
+    fpa_units, fpa_billable = cube.period_units(fpa_starts, fpa_ends, allow_missing_prev_fpa)
+    return compute_bills(units, fpa_units.sum(axis=-1), tariff), billable & fpa_billable
+
+
+def month_ordinals(cube, bill_month, fpa_month, allow_missing_prev_bill=False, allow_missing_prev_fpa=False):
+    """Ordinals of the bill and FPA months, checking their previous readings.
+
+    Raises ``ValueError`` if a month is unknown, or if its previous reading
+    is missing and the matching ``allow_missing_prev_*`` flag is not set.
+    """
+    idx, fpa_idx = cube.ordinal(bill_month, "billing"), cube.ordinal(fpa_month, "FPA")
+    for month, i, allowed, purpose in ((bill_month, idx, allow_missing_prev_bill, "billing"),
+                                       (fpa_month, fpa_idx, allow_missing_prev_fpa, "FPA")):
+        if not (allowed or cube.has_previous(i)):
+            raise ValueError(f"❌ Missing previous month reading for {purpose}: {cube.previous(month)}")
+    return idx, fpa_idx
+
+
+def bill_month(data, tariff, bill_month, fpa_month,
+               allow_missing_prev_bill=False, allow_missing_prev_fpa=False, months=None):
+    """Bill every department for one bill month and one FPA month.
+
+    ``data`` is the readings frame (or a ``ReadingCube``).  Returns a frame
+    with ``Department`` followed by ``BILL_COLUMNS``.  Raises ``ValueError``
+    if either month or its previous reading is missing.  ``months`` is the
+    detected month list, if the caller already has it.
+    """
+    cube = as_cube(data, months)
+    idx, fpa_idx = month_ordinals(cube, bill_month, fpa_month, allow_missing_prev_bill, allow_missing_prev_fpa)
+    bills, _ = period_bills(cube, tariff, idx, idx, fpa_idx, fpa_idx,
+                            allow_missing_prev_bill, allow_missing_prev_fpa)
+    index = data.index if isinstance(data, pd.DataFrame) else None
+    out = pd.DataFrame({col: bills[col][:, 0] for col in BILL_COLUMNS}, index=index)
+    out.insert(0, "Department", cube.departments)
+    return out
+
+
+def bill_periods(data, tariff, period_months=1, start=None, end=None, fpa_lag=0,
+                 allow_missing_prev=False, months=None):
+    """Bill every department for back-to-back periods in one pass.
+
+    ``period_months`` is the period length (1 monthly, 3 quarterly, 12
+    yearly) and ``start``/``end`` limit the months covered.  The FPA period
+    of each bill period is the same length, ``fpa_lag`` months earlier.
+    Periods without a previous reading (or without an FPA period) are left
+    out unless ``allow_missing_prev`` is set.  Returns a long frame with one
+    row per department and period.
+    """
+    cube = as_cube(data, months)
+    starts, ends = cube.consecutive_periods(period_months, start, end)
+    fpa_starts, fpa_ends = starts - fpa_lag, ends - fpa_lag
+    keep = fpa_starts >= 0
+    starts, ends, fpa_starts, fpa_ends = starts[keep], ends[keep], fpa_starts[keep], fpa_ends[keep]
+
+    bills, billable = period_bills(cube, tariff, starts, ends, fpa_starts, fpa_ends,
+                                   allow_missing_prev, allow_missing_prev)
+    keep = np.flatnonzero(billable)
+    labels = np.asarray(cube.months)
+
+    def period_label(first, last):
+        if period_months == 1:
+            return labels[first]
+        return np.char.add(np.char.add(labels[first].astype(str), " to "), labels[last].astype(str))
+
+    n_dept, n_period = len(cube), len(keep)
+    out = pd.DataFrame({col: bills[col][:, keep].reshape(-1) for col in BILL_COLUMNS})
+    out.insert(0, "FPA Period", np.tile(period_label(fpa_starts[keep], fpa_ends[keep]), n_dept))
+    out.insert(0, "Bill Period", np.tile(period_label(starts[keep], ends[keep]), n_dept))
+    out.insert(0, "Department", np.repeat(cube.departments, n_period))
+    return out
+
+
+def bill_all_months(data, tariff, fpa_lag=0, allow_missing_prev=False, months=None):
+    """Bill every department for every detected month in one pass.
+
+    The FPA month of each bill month is ``fpa_lag`` detected months earlier.
+    Returns a long frame with one row per department and bill month.
+    """
+    out = bill_periods(data, tariff, 1, fpa_lag=fpa_lag, allow_missing_prev=allow_missing_prev, months=months)
+    return out.rename(columns={"Bill Period": "Bill Month", "FPA Period": "FPA Month"})
+
+
+# ---------- Totals ----------
+class ExactTotals:
+    """Running column totals that do not depend on how the rows are chunked.
+
+    Each column keeps its exact running sum as a few non-overlapping floats
+    (see ``exact_parts``) and rounds to float only once at the end.  Billing
+    in chunks therefore gives the same totals, to the last bit, as billing
+    the whole workbook at once.  NaN or infinite values raise ``ValueError``.
+    """
+
+    def __init__(self, columns=BILL_COLUMNS):
+        self.columns = list(columns)
+        self.parts = {col: [] for col in self.columns}
+
+    def add(self, bills):
+        for col in self.columns:
+            values = np.asarray(bills[col], dtype=float)
+            if not np.isfinite(values).all():
+                raise ValueError(f"❌ {col} has missing or infinite values; totals cannot be computed")
+            self.parts[col] = exact_parts(self.parts[col] + values.tolist())
+        return self
+
+    def totals(self):
+        return {col: math.fsum(self.parts[col]) for col in self.columns}
+
+
+def exact_parts(values):
+    """Non-overlapping floats whose sum is exactly the sum of ``values``.
+
+    ``math.fsum`` rounds the exact sum once; what it rounded away is itself
+    an exact sum (of the values and the negated parts so far), so repeating
+    until nothing is left loses no bits.  Sums of doubles need a handful of
+    parts at most.
+    """
+    values = list(values)
+    parts = []
+    while True:
+        part = math.fsum(values)
+        if part == 0:
+            return parts
+        parts.append(part)
+        values.append(-part)
+
+
+def bill_totals(bills):
+    return ExactTotals().add(bills).totals()
+
+
+# ---------- Command Line ----------
+def build_parser():
+    parser = argparse.ArgumentParser(description="Compute departmental electricity bills from a meter-reading workbook.")
+    parser.add_argument("workbook", help="Excel file with '<Mon-YY> T1/T2' reading columns")
+    parser.add_argument("--t1", type=float, required=True, help="T1 tariff rate (Rs/unit)")
+    parser.add_argument("--t2", type=float, required=True, help="T2 tariff rate (Rs/unit)")
+    parser.add_argument("--fc-surcharge", type=float, default=0.0, help="FC surcharge rate (Rs/unit)")
+    parser.add_argument("--qtr", type=float, default=0.0, help="Qtr tariff rate (Rs/unit)")
+    parser.add_argument("--fpa", type=float, default=0.0, help="FPA rate (Rs/unit)")
+    parser.add_argument("--no-gst", action="store_true", help="do not apply 18%% GST on the base bill")
+    parser.add_argument("--no-fpa", action="store_true", help="do not apply FPA charges")
+    parser.add_argument("--no-fpa-gst", action="store_true", help="do not apply 18%% GST on FPA")
+    parser.add_argument("--month", help="bill a single month (e.g. Jul-24) instead of every month")
+    parser.add_argument("--fpa-month", help="FPA month for --month (defaults to the bill month)")
+    parser.add_argument("--fpa-lag", type=int, default=0, help="FPA month offset, in months, when billing every month")
+    parser.add_argument("--period-months", type=int, default=1,
+                        help="bill back-to-back periods of this many months (3 quarterly, 12 yearly)")
+    parser.add_argument("--start", help="first month billed when billing periods")
+    parser.add_argument("--end", help="last month billed when billing periods")
+    parser.add_argument("--allow-missing-prev", action="store_true",
+                        help="use the current reading when the previous month is missing")
+    parser.add_argument("--out", default="iesco_bill_summary.csv", help="CSV output path")
+    return parser
+
+
+def tariff_from_args(args):
+    return Tariff(
+        t1=args.t1, t2=args.t2, fc_surcharge=args.fc_surcharge, qtr=args.qtr, fpa=args.fpa,
+        apply_gst=not args.no_gst, apply_fpa=not args.no_fpa,
+        apply_fpa_gst=not (args.no_fpa or args.no_fpa_gst),
+    )
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    tariff = tariff_from_args(args)
+    df = load_readings(args.workbook)
+
+    if args.month:
+        bills = bill_month(df, tariff, args.month, args.fpa_month or args.month,
+                           args.allow_missing_prev, args.allow_missing_prev)
+    elif args.period_months > 1 or args.start or args.end:
+        bills = bill_periods(df, tariff, args.period_months, args.start, args.end,
+                             args.fpa_lag, args.allow_missing_prev)
+    else:
+        bills = bill_all_months(df, tariff, args.fpa_lag, args.allow_missing_prev)
+
+    bills.round(2).to_csv(args.out, index=False)
+    print(f"Wrote {len(bills)} bills to {args.out}")
+    print(f"Final Total Bill: Rs. {bill_totals(bills)['Total Bill']:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Persistent billing ledger for incremental month-end runs.
+
+Computed bills are stored in a local SQLite file keyed by (department, bill
+month, FPA month, tariff hash), together with a hash of the readings each
+bill was computed from.  When a workbook is re-uploaded only the departments
+and months whose readings or tariff changed are recomputed; everything else
+is served from the ledger.
+
+Usage:
+    python billing_ledger.py readings.xlsx --t1 45.5 --t2 38.2 --fpa-lag 1 \
+        --ledger billing_ledger.sqlite --out bills.csv
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import asdict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from billing_engine import (
+    BILL_COLUMNS, as_cube, bill_totals, build_parser, load_readings, month_ordinals, period_bills,
+    tariff_from_args,
+)
+
+DEFAULT_LEDGER_PATH = Path.home() / ".cache" / "electricity_billing" / "billing_ledger.sqlite"
+
+# SQL-safe names for the bill columns, e.g. "GST (18%)" -> "gst_18"
+LEDGER_COLUMNS = {
+    col: "_".join(col.lower().replace("(", " ").replace(")", " ").replace("%", " ").split())
+    for col in BILL_COLUMNS
+}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS bills (
+    department TEXT NOT NULL,
+    bill_month TEXT NOT NULL,
+    fpa_month TEXT NOT NULL,
+    tariff_hash TEXT NOT NULL,
+    input_hash INTEGER NOT NULL,
+    {", ".join(f"{name} REAL" for name in LEDGER_COLUMNS.values())},
+    PRIMARY KEY (department, bill_month, fpa_month, tariff_hash)
+)
+"""
+
+
+def ledger_path():
+    return Path(os.environ.get("BILLING_LEDGER_PATH", DEFAULT_LEDGER_PATH))
+
+
+def tariff_hash(tariff, allow_missing_prev_bill=False, allow_missing_prev_fpa=False):
+    params = dict(asdict(tariff), allow_missing_prev_bill=allow_missing_prev_bill,
+                  allow_missing_prev_fpa=allow_missing_prev_fpa)
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def input_hashes(cube, starts, fpa_starts):
+    """Hash the readings behind every (department, bill month) element.
+
+    A bill depends on the current and previous readings of its bill month
+    and of its FPA month, and on whether those previous columns exist.
+    Returns a signed 64-bit ``(departments, periods)`` array.
+    """
+    def month_inputs(idx):
+        prev = np.maximum(idx - 1, 0)
+        prev_present = cube.present[prev] & (idx > 0)[:, None]
+        prev_readings = np.where(prev_present, cube.readings[:, prev], np.nan)
+        flags = np.broadcast_to(prev_present, cube.readings[:, idx].shape).astype(float)
+        return [cube.readings[:, idx], prev_readings, flags]
+
+    parts = month_inputs(starts) + month_inputs(fpa_starts)
+    stacked = np.concatenate(parts, axis=-1).reshape(-1, sum(p.shape[-1] for p in parts))
+    hashed = pd.util.hash_pandas_object(pd.DataFrame(stacked), index=False).to_numpy()
+    return hashed.view(np.int64).reshape(len(cube), len(starts))
+
+
+class BillingLedger:
+    """SQLite-backed store of computed bills."""
+
+    def __init__(self, path=None):
+        self.path = Path(path or ledger_path())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.last_run = {"computed": 0, "reused": 0}
+        with self._connect() as conn:
+            conn.execute(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:  # commits on success, rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def bill_month(self, data, tariff, bill_month, fpa_month,
+                   allow_missing_prev_bill=False, allow_missing_prev_fpa=False, months=None):
+        """Ledger-backed ``billing_engine.bill_month``."""
+        cube = as_cube(data, months)
+        idx, fpa_idx = month_ordinals(cube, bill_month, fpa_month, allow_missing_prev_bill, allow_missing_prev_fpa)
+
+        out = self._bills(cube, tariff, np.array([idx]), np.array([fpa_idx]),
+                          allow_missing_prev_bill, allow_missing_prev_fpa)
+        out = out.drop(columns=["Bill Month", "FPA Month"])
+        if isinstance(data, pd.DataFrame):
+            out.index = data.index
+        return out
+
+    def bill_all_months(self, data, tariff, fpa_lag=0, allow_missing_prev=False, months=None):
+        """Ledger-backed ``billing_engine.bill_all_months``."""
+        cube = as_cube(data, months)
+        starts = np.arange(fpa_lag, len(cube.months))
+        fpa_starts = starts - fpa_lag
+        units_ok = np.array([allow_missing_prev or cube.has_previous(i) for i in starts], dtype=bool)
+        fpa_ok = np.array([allow_missing_prev or cube.has_previous(i) for i in fpa_starts], dtype=bool)
+        keep = units_ok & fpa_ok
+        return self._bills(cube, tariff, starts[keep], fpa_starts[keep], allow_missing_prev, allow_missing_prev)
+
+    def _bills(self, cube, tariff, starts, fpa_starts, allow_missing_prev_bill, allow_missing_prev_fpa):
+        key = tariff_hash(tariff, allow_missing_prev_bill, allow_missing_prev_fpa)
+        labels = np.asarray(cube.months)
+        n_dept, n_period = len(cube), len(starts)
+
+        current = pd.DataFrame({
+            "department": np.repeat(cube.departments.astype(str), n_period),
+            "bill_month": np.tile(labels[starts], n_dept),
+            "fpa_month": np.tile(labels[fpa_starts], n_dept),
+            "input_hash": input_hashes(cube, starts, fpa_starts).reshape(-1),
+        })
+
+        stored = self._load(key, labels[starts])
+        merged = current.merge(stored, on=["department", "bill_month", "fpa_month"], how="left",
+                               suffixes=("", "_stored"))
+        stale = merged["input_hash_stored"].ne(merged["input_hash"]).fillna(True)
+        stale = stale.to_numpy(dtype=bool).reshape(n_dept, n_period)
+
+        values = np.array(merged[list(LEDGER_COLUMNS.values())], dtype=float).reshape(n_dept, n_period, -1)
+        dept_sel, period_sel = np.flatnonzero(stale.any(axis=1)), np.flatnonzero(stale.any(axis=0))
+        if len(dept_sel) and len(period_sel):
+            sub = type(cube)(cube.departments[dept_sel], cube.months, cube.readings[dept_sel], cube.present)
+            s, f = starts[period_sel], fpa_starts[period_sel]
+            bills, _ = period_bills(sub, tariff, s, s, f, f, allow_missing_prev_bill, allow_missing_prev_fpa)
+            block = np.stack([bills[col] for col in BILL_COLUMNS], axis=-1)
+            values[np.ix_(dept_sel, period_sel)] = block
+            self._store(key, merged, stale, values)
+
+        self.last_run = {"computed": int(stale.sum()), "reused": int(stale.size - stale.sum())}
+        out = pd.DataFrame(values.reshape(-1, len(BILL_COLUMNS)), columns=BILL_COLUMNS)
+        out.insert(0, "FPA Month", current["fpa_month"].to_numpy())
+        out.insert(0, "Bill Month", current["bill_month"].to_numpy())
+        out.insert(0, "Department", np.repeat(cube.departments, n_period))
+        return out
+
+    def _load(self, key, bill_months):
+        columns = ["department", "bill_month", "fpa_month", "input_hash"] + list(LEDGER_COLUMNS.values())
+        if len(bill_months) == 0:
+            return pd.DataFrame(columns=columns).astype({"input_hash": "Int64"}).rename(
+                columns={"input_hash": "input_hash_stored"})
+        placeholders = ", ".join("?" * len(bill_months))
+        query = (f"SELECT {', '.join(columns)} FROM bills "
+                 f"WHERE tariff_hash = ? AND bill_month IN ({placeholders})")
+        with self._connect() as conn:
+            stored = pd.read_sql_query(query, conn, params=[key, *map(str, bill_months)])
+        # nullable ints keep the 64-bit hashes exact once unmatched rows become NA
+        stored["input_hash"] = stored["input_hash"].astype("Int64")
+        return stored.rename(columns={"input_hash": "input_hash_stored"})
+
+    def _store(self, key, merged, stale, values):
+        rows = np.flatnonzero(stale.reshape(-1))
+        flat = values.reshape(-1, len(BILL_COLUMNS))[rows]
+        records = zip(
+            merged["department"].to_numpy()[rows], merged["bill_month"].to_numpy()[rows],
+            merged["fpa_month"].to_numpy()[rows], [key] * len(rows),
+            merged["input_hash"].to_numpy()[rows].tolist(), *flat.T.tolist(),
+        )
+        names = ["department", "bill_month", "fpa_month", "tariff_hash", "input_hash"] + list(LEDGER_COLUMNS.values())
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO bills ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                records,
+            )
+
+
+def main(argv=None):
+    parser = build_parser()
+    parser.description = "Bill a meter-reading workbook, recomputing only what changed since the last run."
+    parser.add_argument("--ledger", default=None, help=f"ledger file (default: {DEFAULT_LEDGER_PATH})")
+    args = parser.parse_args(argv)
+    if args.period_months != 1 or args.start or args.end:
+        # the ledger is keyed by bill month; multi-month periods would be written as monthly rows
+        parser.error("--period-months, --start and --end are not supported with the ledger; "
+                     "use billing_engine.py to bill periods")
+
+    ledger = BillingLedger(args.ledger)
+    tariff = tariff_from_args(args)
+    df = load_readings(args.workbook)
+    if args.month:
+        bills = ledger.bill_month(df, tariff, args.month, args.fpa_month or args.month,
+                                  args.allow_missing_prev, args.allow_missing_prev)
+    else:
+        bills = ledger.bill_all_months(df, tariff, args.fpa_lag, args.allow_missing_prev)
+
+    bills.round(2).to_csv(args.out, index=False)
+    print(f"Wrote {len(bills)} bills to {args.out} "
+          f"({ledger.last_run['computed']} computed, {ledger.last_run['reused']} from ledger)")
+    print(f"Final Total Bill: Rs. {bill_totals(bills)['Total Bill']:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
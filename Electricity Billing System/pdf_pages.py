@@ -0,0 +1,245 @@
+"""Page-level PDF copying, streamed to the output.
+
+``read_pages`` parses a PDF with pypdf and splits it into ``PageParts``:
+content streams, resources, media box and rotation, detached from the source
+file.  ``PdfPageWriter`` writes pages to a binary file object as they are
+added and writes the page tree, catalog and cross-reference table on
+``close()``, so a merged document never sits in memory.  Non-stream objects
+that serialize identically (fonts, resource dictionaries) are written once
+and shared by every page that uses them.
+
+    writer = PdfPageWriter(fh)
+    for shard in shard_paths:
+        for page in read_pages(shard):
+            writer.add_page(page)
+    writer.close()
+"""
+import io
+import weakref
+import zlib
+from collections import namedtuple
+from pathlib import Path
+
+from pypdf import PdfReader
+from pypdf.generic import (ArrayObject, DecodedStreamObject, DictionaryObject, IndirectObject, NameObject,
+                           NumberObject, StreamObject)
+
+PageParts = namedtuple("PageParts", ["contents", "resources", "media_box", "rotate"])
+
+# text drawn over a page: content operators and the fonts (name -> Ref) they use
+Overlay = namedtuple("Overlay", ["ops", "fonts"])
+
+# stream keys rewritten on copy; the data is re-compressed with zlib
+STREAM_KEYS = ("/Filter", "/DecodeParms", "/Length")
+FLATE = NameObject("/FlateDecode")
+
+
+class Ref:
+    """An object written once per document and referred to by number."""
+
+    __slots__ = ("value", "__weakref__")
+
+    def __init__(self, value):
+        self.value = value
+
+
+def stream(data, compress=True):
+    """``Ref`` to a stream of ``data``; the stored bytes are written as they are, so compression happens here."""
+    obj = DecodedStreamObject()
+    if compress:
+        obj[NameObject("/Filter")] = FLATE
+        data = zlib.compress(data)
+    obj.set_data(data)
+    return Ref(obj)
+
+
+def _detach(value, memo):
+    """Copy of a pypdf object with every indirect reference replaced by a shared ``Ref``."""
+    if isinstance(value, IndirectObject):
+        key = (value.idnum, value.generation)
+        if key not in memo:
+            memo[key] = None  # in progress
+            memo[key] = Ref(_detach(value.get_object(), memo))
+        elif memo[key] is None:
+            raise ValueError("❌ Cyclic page resources are not supported")
+        return memo[key]
+    if isinstance(value, StreamObject):
+        filters = value.get("/Filter")
+        if filters not in (None, FLATE, [FLATE]):
+            raise ValueError(f"❌ Only Flate-compressed streams can be copied, not {filters}")
+        copy = DecodedStreamObject()
+        copy.update({key: _detach(item, memo) for key, item in value.items() if key not in STREAM_KEYS})
+        copy[NameObject("/Filter")] = FLATE
+        copy.set_data(zlib.compress(value.get_data()))
+        return copy
+    if isinstance(value, DictionaryObject):
+        return DictionaryObject({key: _detach(item, memo) for key, item in value.items()})
+    if isinstance(value, ArrayObject):
+        return ArrayObject(_detach(item, memo) for item in value)
+    return value
+
+
+def _inline(value):
+    """``value`` with every ``Ref`` replaced by its object, or ``None`` if it holds a stream."""
+    if isinstance(value, Ref):
+        value = value.value
+    if isinstance(value, StreamObject):
+        return None
+    if isinstance(value, DictionaryObject):
+        items = {key: _inline(item) for key, item in value.items()}
+        return None if any(item is None for item in items.values()) else DictionaryObject(items)
+    if isinstance(value, ArrayObject):
+        items = [_inline(item) for item in value]
+        return None if any(item is None for item in items) else ArrayObject(items)
+    return value
+
+
+def read_pages(source, interned=None):
+    """``PageParts`` of every page of ``source`` (PDF bytes, a path or a binary file object).
+
+    Pages read with the same ``interned`` dict share one object for equal
+    resources, so a writer serializes them once instead of once per page.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    elif isinstance(source, (str, Path)):
+        source = io.BytesIO(Path(source).read_bytes())
+    reader = PdfReader(source)
+
+    memo = {}
+    pages = []
+    for page in reader.pages:  # inherited resources and media box are copied onto every page
+        contents = page.raw_get("/Contents") if "/Contents" in page else ArrayObject()
+        if isinstance(contents.get_object(), ArrayObject):
+            contents = contents.get_object()
+        else:
+            contents = [contents]
+        resources = _detach(page.raw_get("/Resources"), memo) if "/Resources" in page else DictionaryObject()
+        if interned is not None:
+            inline = _inline(resources)
+            if inline is not None:
+                resources = interned.setdefault(_serialize(inline), resources)
+        pages.append(PageParts(
+            tuple(_detach(item, memo) for item in contents),
+            resources,
+            ArrayObject(page.mediabox),
+            page.rotation,
+        ))
+    return pages
+
+
+def _serialize(obj):
+    buf = io.BytesIO()
+    obj.write_to_stream(buf)
+    return buf.getvalue()
+
+
+class PdfPageWriter:
+    """Writes a PDF to ``out`` one page at a time."""
+
+    CATALOG, PAGES = 1, 2
+
+    def __init__(self, out):
+        self.out = out
+        self._pos = 0
+        self._offsets = {}
+        self._next = 3
+        self._kids = []
+        self._numbers = weakref.WeakKeyDictionary()   # Ref -> object number
+        self._shared = {}                              # serialized non-stream object -> object number
+        self._overlaid = weakref.WeakKeyDictionary()  # resources Ref -> {fonts key: resources with the fonts}
+        self._save_state = stream(b"q\n", compress=False)
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def __len__(self):
+        return len(self._kids)
+
+    def _write(self, data):
+        self.out.write(data)
+        self._pos += len(data)
+
+    def _emit(self, body, number=None):
+        if number is None:
+            number, self._next = self._next, self._next + 1
+        self._offsets[number] = self._pos
+        self._write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        return number
+
+    def _ref(self, ref):
+        number = self._numbers.get(ref)
+        if number is None:
+            value = ref.value
+            if isinstance(value, StreamObject):
+                copy = DecodedStreamObject()
+                copy.update({key: self._resolve(item) for key, item in value.items()})
+                copy.set_data(value.get_data())
+                number = self._emit(_serialize(copy))
+            else:
+                body = _serialize(self._resolve(value))
+                number = self._shared.get(body)
+                if number is None:
+                    number = self._shared[body] = self._emit(body)
+            self._numbers[ref] = number
+        return IndirectObject(number, 0, None)
+
+    def _resolve(self, value):
+        if isinstance(value, Ref):
+            return self._ref(value)
+        if isinstance(value, DictionaryObject):
+            return DictionaryObject({key: self._resolve(item) for key, item in value.items()})
+        if isinstance(value, ArrayObject):
+            return ArrayObject(self._resolve(item) for item in value)
+        return value
+
+    def _with_fonts(self, resources, fonts):
+        """``resources`` plus the overlay ``fonts``, built once per resources object."""
+        if not isinstance(resources, Ref):
+            resources = Ref(resources)
+        variants = self._overlaid.setdefault(resources, {})
+        key = tuple(sorted((name, id(font)) for name, font in fonts.items()))
+        if key not in variants:
+            merged = DictionaryObject(resources.value)
+            font_dict = merged.get("/Font", DictionaryObject())
+            merged[NameObject("/Font")] = DictionaryObject(font_dict.value if isinstance(font_dict, Ref) else font_dict)
+            merged["/Font"].update({NameObject(name): font for name, font in fonts.items()})
+            variants[key] = Ref(merged)
+        return variants[key]
+
+    def add_page(self, parts, overlay=None):
+        """Write one page; ``overlay`` is drawn on top of it in a clean graphics state."""
+        contents = [self._ref(item) for item in parts.contents]
+        resources = parts.resources
+        if overlay is not None:
+            resources = self._with_fonts(resources, overlay.fonts)
+            contents = ([self._ref(self._save_state)] + contents
+                        + [self._ref(stream(b"Q\n" + overlay.ops, compress=False))])
+        page = DictionaryObject({
+            NameObject("/Type"): NameObject("/Page"),
+            NameObject("/Parent"): IndirectObject(self.PAGES, 0, None),
+            NameObject("/MediaBox"): parts.media_box,
+            NameObject("/Resources"): self._resolve(resources),
+            NameObject("/Contents"): ArrayObject(contents),
+        })
+        if parts.rotate:
+            page[NameObject("/Rotate")] = NumberObject(parts.rotate)
+        self._kids.append(self._emit(_serialize(page)))
+
+    def close(self):
+        """Write the page tree, catalog, cross-reference table and trailer (``out`` stays open)."""
+        pages = DictionaryObject({
+            NameObject("/Type"): NameObject("/Pages"),
+            NameObject("/Kids"): ArrayObject(IndirectObject(n, 0, None) for n in self._kids),
+            NameObject("/Count"): NumberObject(len(self._kids)),
+        })
+        self._emit(_serialize(pages), self.PAGES)
+        catalog = DictionaryObject({
+            NameObject("/Type"): NameObject("/Catalog"),
+            NameObject("/Pages"): IndirectObject(self.PAGES, 0, None),
+        })
+        self._emit(_serialize(catalog), self.CATALOG)
+
+        xref = self._pos
+        self._write(b"xref\n0 %d\n0000000000 65535 f \n" % self._next)
+        self._write(b"".join(b"%010d 00000 n \n" % self._offsets[n] for n in range(1, self._next)))
+        self._write(b"trailer\n<</Size %d /Root %d 0 R>>\nstartxref\n%d\n%%%%EOF\n"
+                    % (self._next, self.CATALOG, xref))
@@ -0,0 +1,125 @@
+"""On-disk cache of parsed meter-reading workbooks.
+
+Streamlit reruns the billing page on every sidebar change, and parsing the
+uploaded XLSX with openpyxl dominates each rerun.  Parsed workbooks are
+stored here keyed by the SHA-256 of the upload, as an uncompressed Arrow IPC
+file (memory-mapped on load) next to the detected month list.  The cache
+directory is bounded in size and evicts least recently used entries.
+
+Settings (environment variables):
+    BILLING_CACHE_DIR        cache directory (default: ~/.cache/electricity_billing)
+    BILLING_CACHE_MAX_BYTES  size limit in bytes (default: 512 MB)
+"""
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from billing_engine import detect_months, load_readings
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # the cache is optional; without pyarrow every upload is parsed
+    pa = None
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "electricity_billing"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+READINGS_FILE = "readings.arrow"
+MONTHS_FILE = "months.json"
+
+
+def cache_dir():
+    return Path(os.environ.get("BILLING_CACHE_DIR", DEFAULT_CACHE_DIR))
+
+
+def max_cache_bytes(variable="BILLING_CACHE_MAX_BYTES", default=DEFAULT_MAX_BYTES):
+    """Size limit in bytes from the environment ``variable``; the page cache passes its own."""
+    return int(os.environ.get(variable, default))
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def load_cached_readings(data, root=None, max_bytes=None):
+    """Return ``(df, detected_months)`` for the workbook bytes ``data``.
+
+    A hit memory-maps the stored Arrow table; a miss parses the workbook,
+    stores it and evicts old entries until the cache fits ``max_bytes``.
+    """
+    if pa is None:
+        df = load_readings(io.BytesIO(data))
+        return df, detect_months(df.columns)
+
+    root = Path(root or cache_dir())
+    entry = root / content_hash(data)
+    if (entry / MONTHS_FILE).exists():
+        try:
+            return _read_entry(entry)
+        except (OSError, ValueError, pa.ArrowException):
+            shutil.rmtree(entry, ignore_errors=True)
+
+    df = load_readings(io.BytesIO(data))
+    months = detect_months(df.columns)
+    try:
+        _write_entry(root, entry, df, months)
+    except (OSError, pa.ArrowException):
+        # mixed-type columns Arrow cannot store, or an unwritable cache dir:
+        # serve the parsed frame and skip caching
+        pass
+    else:
+        evict(root, max_bytes if max_bytes is not None else max_cache_bytes(), keep=entry)
+    return df, months
+
+
+def _read_entry(entry):
+    table = feather.read_table(entry / READINGS_FILE, memory_map=True)
+    months = json.loads((entry / MONTHS_FILE).read_text(encoding="utf-8"))
+    now = time.time()
+    os.utime(entry, (now, now))  # mark as recently used
+    return table.to_pandas(), months
+
+
+def _write_entry(root, entry, df, months):
+    root.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(dir=root, prefix=".tmp-"))
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        feather.write_feather(table, tmp / READINGS_FILE, compression="uncompressed")
+        # the month list is written last: its presence marks a complete entry
+        (tmp / MONTHS_FILE).write_text(json.dumps(months), encoding="utf-8")
+        os.replace(tmp, entry)
+    except OSError:
+        if entry.exists():  # another worker stored the same upload first
+            return
+        raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def entry_size(entry):
+    return sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+
+
+def evict(root, max_bytes, keep=None):
+    """Delete least recently used entries until the cache fits ``max_bytes``."""
+    entries = []
+    for entry in Path(root).iterdir():
+        if entry.is_dir() and not entry.name.startswith("."):
+            entries.append((entry.stat().st_mtime, entry_size(entry), entry))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries, key=lambda e: e[0]):
+        if total <= max_bytes:
+            break
+        if entry == keep:
+            continue
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+    return total
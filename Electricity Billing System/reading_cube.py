@@ -0,0 +1,116 @@
+"""Indexed meter-reading cube.
+
+The workbook's ``"<Mon-YY> T1"`` / ``"<Mon-YY> T2"`` columns are held as one
+dense ``(department, month ordinal, tariff slot)`` float array.  Months are
+addressed through a label -> ordinal dict, so the previous month of any
+month is ``ordinal - 1`` and billing periods of any length are slices of the
+month axis rather than string manipulation on column names.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+TARIFF_SLOTS = ("T1", "T2")
+MONTH_FORMAT = "%b-%y"
+
+
+# ---------- Month Detection ----------
+def parse_month(label):
+    try:
+        return datetime.strptime(label, MONTH_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+def detect_months(columns):
+    """Return the ``Mon-YY`` labels found in T1/T2 column names, oldest first."""
+    raw_months = {str(col).split()[0] for col in columns if "T1" in str(col) or "T2" in str(col)}
+    parsed = {m: parse_month(m) for m in raw_months}
+    return sorted((m for m in raw_months if parsed[m] is not None), key=parsed.get)
+
+
+def reading_columns(months):
+    return [f"{m} {slot}" for m in months for slot in TARIFF_SLOTS]
+
+
+# ---------- Reading Cube ----------
+class ReadingCube:
+    """Readings indexed by ``(department, month ordinal, tariff slot)``.
+
+    ``readings`` is NaN wherever a reading is missing; ``present`` marks the
+    ``(month, slot)`` columns that exist in the workbook at all, and
+    ``missing`` marks individual empty cells.
+    """
+
+    def __init__(self, departments, months, readings, present=None):
+        self.departments = np.asarray(departments)
+        self.months = list(months)
+        self.ordinals = {m: i for i, m in enumerate(self.months)}
+        self.readings = np.asarray(readings, dtype=float)
+        self.missing = np.isnan(self.readings)
+        self.present = ~self.missing.all(axis=0) if present is None else np.asarray(present, dtype=bool)
+
+    @classmethod
+    def from_frame(cls, df, months=None):
+        months = months or detect_months(df.columns)
+        columns = reading_columns(months)
+        present = np.array([col in df.columns for col in columns]).reshape(len(months), len(TARIFF_SLOTS))
+        values = df.reindex(columns=columns).apply(pd.to_numeric, errors="coerce")
+        readings = values.to_numpy(dtype=float).reshape(len(df), len(months), len(TARIFF_SLOTS))
+        return cls(df["Department"].to_numpy(), months, readings, present)
+
+    def __len__(self):
+        return len(self.departments)
+
+    def ordinal(self, month, purpose="billing"):
+        try:
+            return self.ordinals[month]
+        except KeyError:
+            raise ValueError(f"❌ No readings found for {purpose} month: {month}") from None
+
+    def previous(self, month):
+        idx = self.ordinal(month)
+        return self.months[idx - 1] if idx > 0 else None
+
+    def has_previous(self, idx):
+        """Whether both readings of the month before ordinal ``idx`` exist."""
+        return idx > 0 and bool(self.present[idx - 1].all())
+
+    def period_ordinals(self, start, end):
+        """Ordinals of the first and last month of a ``start``..``end`` period."""
+        first, last = self.ordinal(start), self.ordinal(end)
+        if last < first:
+            raise ValueError(f"❌ Billing period ends before it starts: {start} to {end}")
+        return first, last
+
+    def consecutive_periods(self, length, start=None, end=None):
+        """Split ``start``..``end`` into back-to-back periods of ``length`` months.
+
+        Returns ``(starts, ends)`` ordinal arrays; a trailing partial period
+        is dropped.  ``length=3`` gives quarters, ``length=12`` years.
+        """
+        if not self.months:
+            return np.array([], dtype=int), np.array([], dtype=int)
+        first, last = self.period_ordinals(start or self.months[0], end or self.months[-1])
+        starts = np.arange(first, last - length + 2, length)
+        return starts, starts + length - 1
+
+    def period_units(self, starts, ends, allow_missing_prev=False):
+        """Units consumed over each ``starts[i]``..``ends[i]`` period.
+
+        Units are the reading at the end of the period minus the reading of
+        the month before it starts.  Where that previous reading column is
+        missing the end reading is used if ``allow_missing_prev`` is set;
+        otherwise the period is flagged in the returned ``(periods,)``
+        ``billable`` mask.  Empty cells count as zero units.  Returns
+        ``(units, billable)`` with ``units`` shaped ``(departments, periods, 2)``.
+        """
+        starts, ends = np.atleast_1d(starts), np.atleast_1d(ends)
+        prev = starts - 1
+        prev_present = self.present[np.maximum(prev, 0)] & (prev >= 0)[:, None]
+
+        curr = self.readings[:, ends]
+        units = np.where(prev_present, curr - self.readings[:, np.maximum(prev, 0)], curr)
+        billable = prev_present.all(axis=1) | allow_missing_prev
+        return np.nan_to_num(units, nan=0.0), billable
@@ -0,0 +1,97 @@
+"""Bounded-memory billing for very large meter-reading workbooks.
+
+The workbook is read row by row with openpyxl's read-only reader, billed in
+fixed-size chunks with the same engine as the Streamlit page, and the CSV
+summary is appended as each chunk completes.  Peak memory depends on the
+chunk size, not on the number of departments, and the totals are exactly
+those of the in-memory path (see ``billing_engine.ExactTotals``).
+
+Usage:
+    python streaming_ingest.py readings.xlsx --t1 45.5 --t2 38.2 \
+        --month Sep-24 --fpa-month Aug-24 --chunk-size 20000 --out bills.csv
+    python streaming_ingest.py readings.xlsx --t1 45.5 --t2 38.2 --period-months 3 --out quarterly.csv
+"""
+from itertools import islice
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from billing_engine import (
+    ExactTotals, bill_all_months, bill_month, bill_periods, build_parser, detect_months,
+    reading_columns, tariff_from_args,
+)
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+def iter_reading_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield ``(months, chunk)`` frames of at most ``chunk_size`` departments.
+
+    Only the ``Department`` and reading columns are kept from each row.
+    """
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = [str(col).strip() if col is not None else "" for col in next(rows, ())]
+        months = detect_months(header)
+        wanted = ["Department"] + [col for col in reading_columns(months) if col in header]
+        positions = [header.index(col) for col in wanted]
+
+        while True:
+            block = list(islice(rows, chunk_size))
+            if not block:
+                break
+            records = [[row[i] if i < len(row) else None for i in positions] for row in block]
+            yield months, pd.DataFrame.from_records(records, columns=wanted)
+    finally:
+        wb.close()
+
+
+def stream_bills(path, tariff, out_csv, bill_month_label=None, fpa_month=None, fpa_lag=0,
+                 allow_missing_prev_bill=False, allow_missing_prev_fpa=False,
+                 chunk_size=DEFAULT_CHUNK_SIZE, period_months=1, start=None, end=None):
+    """Bill ``path`` chunk by chunk, appending rounded rows to ``out_csv``.
+
+    With ``bill_month_label`` one month is billed (as on the Streamlit page).
+    Otherwise ``period_months``, ``start`` and ``end`` select periods as in
+    ``bill_periods``; by default every month is billed as in
+    ``bill_all_months``.  Returns the column totals and the number of rows
+    written.
+    """
+    totals = ExactTotals()
+    n_rows = 0
+    with open(out_csv, "w", newline="", encoding="utf-8") as fh:
+        for months, chunk in iter_reading_chunks(path, chunk_size):
+            if bill_month_label:
+                bills = bill_month(chunk, tariff, bill_month_label, fpa_month or bill_month_label,
+                                   allow_missing_prev_bill, allow_missing_prev_fpa, months=months)
+            elif period_months > 1 or start or end:
+                bills = bill_periods(chunk, tariff, period_months, start, end, fpa_lag, allow_missing_prev_bill,
+                                     months=months)
+            else:
+                bills = bill_all_months(chunk, tariff, fpa_lag, allow_missing_prev_bill, months=months)
+            bills.round(2).to_csv(fh, index=False, header=n_rows == 0)
+            totals.add(bills)
+            n_rows += len(bills)
+    return totals.totals(), n_rows
+
+
+def main(argv=None):
+    parser = build_parser()
+    parser.description = "Bill a large meter-reading workbook in bounded memory."
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="departments billed per chunk")
+    args = parser.parse_args(argv)
+
+    totals, n_rows = stream_bills(
+        args.workbook, tariff_from_args(args), args.out,
+        bill_month_label=args.month, fpa_month=args.fpa_month, fpa_lag=args.fpa_lag,
+        allow_missing_prev_bill=args.allow_missing_prev, allow_missing_prev_fpa=args.allow_missing_prev,
+        chunk_size=args.chunk_size, period_months=args.period_months, start=args.start, end=args.end,
+    )
+    print(f"Wrote {n_rows} bills to {args.out}")
+    print(f"Final Total Bill: Rs. {totals['Total Bill']:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
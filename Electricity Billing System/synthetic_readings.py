@@ -0,0 +1,80 @@
+"""Synthetic meter-reading workbooks for benchmarks.
+
+Generates workbooks in the same layout as
+``Department_Meter_Readings_Jul24_Jun25.xlsx``: ``Sr``, ``Department`` and a
+``"<Mon-YY> T1"`` / ``"<Mon-YY> T2"`` column pair per month, with readings
+that increase month over month.
+
+Usage:
+    python synthetic_readings.py 100000 --months 12 --out readings_100k.xlsx
+"""
+import argparse
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from reading_cube import MONTH_FORMAT, reading_columns
+
+
+def month_labels(n_months, first=date(2024, 7, 1)):
+    labels = []
+    for i in range(n_months):
+        year, month = divmod(first.month - 1 + i, 12)
+        labels.append(date(first.year + year, month + 1, 1).strftime(MONTH_FORMAT))
+    return labels
+
+
+def synthetic_readings(n_departments, n_months=12, seed=0, missing_rate=0.0):
+    """Frame of cumulative T1/T2 readings for ``n_departments`` departments.
+
+    ``missing_rate`` blanks that fraction of reading cells at random.
+    """
+    rng = np.random.default_rng(seed)
+    months = month_labels(n_months)
+    start = rng.uniform(0, 5_000, size=(n_departments, 1, 2))
+    usage = rng.gamma(shape=4.0, scale=60.0, size=(n_departments, n_months, 2))
+    readings = (start + np.cumsum(usage, axis=1)).round(1).reshape(n_departments, -1)
+    if missing_rate:
+        readings[rng.random(readings.shape) < missing_rate] = np.nan
+
+    df = pd.DataFrame(readings, columns=reading_columns(months))
+    df.insert(0, "Department", [f"Dept-{i:07d}" for i in range(n_departments)])
+    df.insert(0, "Sr", np.arange(1, n_departments + 1))
+    return df
+
+
+def write_workbook(path, n_departments, n_months=12, seed=0, missing_rate=0.0, chunk_size=50_000):
+    """Write a synthetic workbook row by row, without holding it all in memory."""
+    months = month_labels(n_months)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Readings")
+    ws.append(["Sr", "Department"] + reading_columns(months))
+    for first in range(0, n_departments, chunk_size):
+        n = min(chunk_size, n_departments - first)
+        chunk = synthetic_readings(n, n_months, seed=seed + first, missing_rate=missing_rate)
+        chunk["Sr"] += first
+        chunk["Department"] = [f"Dept-{i:07d}" for i in range(first, first + n)]
+        for row in chunk.itertuples(index=False):
+            ws.append([None if isinstance(v, float) and np.isnan(v) else v for v in row])
+    wb.save(path)
+    return months
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic meter-reading workbook.")
+    parser.add_argument("departments", type=int)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--missing-rate", type=float, default=0.0, help="fraction of blank reading cells")
+    parser.add_argument("--out", default=None, help="output .xlsx (default: readings_<N>.xlsx)")
+    args = parser.parse_args()
+
+    out = args.out or f"readings_{args.departments}.xlsx"
+    write_workbook(out, args.departments, args.months, args.seed, args.missing_rate)
+    print(f"Wrote {args.departments} departments x {args.months} months to {out}")
+
+
+if __name__ == "__main__":
+    main()
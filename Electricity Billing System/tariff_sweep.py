@@ -0,0 +1,179 @@
+"""Tariff what-if sweeps across many scenarios at once.
+
+A scenario is one set of sidebar inputs: the five rates (``t1``, ``t2``,
+``fc_surcharge``, ``qtr``, ``fpa``) and the three GST/FPA flags.  Every bill
+component is linear in the units, so for one scenario a department's
+Total Bill is
+
+    (t1*T1 + t2*T2 + (fc_surcharge + qtr)*(T1 + T2)) * (1 + GST)
+        + fpa*FPA units * (1 + FPA GST)
+
+which makes the whole ``scenarios x departments`` bill matrix a single
+``(scenarios, 4) @ (4, departments)`` product.  Scenario totals only need
+the column sums of the units.
+
+Usage:
+    python tariff_sweep.py readings.xlsx --month Sep-24 --fpa-month Aug-24 \
+        --grid t1=40,45,50 --grid fpa=0,1.8,3.6 --grid apply_gst=0,1 --out sweep.csv
+"""
+import argparse
+import itertools
+from collections import namedtuple
+from dataclasses import asdict, fields
+
+import numpy as np
+import pandas as pd
+
+from billing_engine import GST_RATE, Tariff, as_cube, load_readings, month_ordinals
+
+RATE_FIELDS = ("t1", "t2", "fc_surcharge", "qtr", "fpa")
+FLAG_FIELDS = ("apply_gst", "apply_fpa", "apply_fpa_gst")
+SCENARIO_FIELDS = tuple(f.name for f in fields(Tariff))
+
+SweepResult = namedtuple("SweepResult", ["totals", "deltas", "departments"])
+
+
+def scenario_grid(base=None, **axes):
+    """Cartesian product of the given field values, on top of ``base``.
+
+    ``scenario_grid(t1=[40, 45], apply_gst=[True, False])`` gives four
+    scenarios; fields not given keep the ``base`` tariff's value.
+    """
+    unknown = set(axes) - set(SCENARIO_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown scenario fields: {sorted(unknown)}")
+    base = asdict(base or Tariff(t1=0.0, t2=0.0))
+    names = list(axes)
+    rows = [dict(base, **dict(zip(names, combo))) for combo in itertools.product(*axes.values())]
+    return pd.DataFrame(rows, columns=list(SCENARIO_FIELDS))
+
+
+def coefficients(scenarios):
+    """Per-scenario coefficients on (T1 units, T2 units, total units, FPA units).
+
+    Returns the coefficient matrix for Total Bill and the parts needed to
+    split scenario totals into bill components.
+    """
+    rates = {f: scenarios[f].to_numpy(dtype=float) for f in RATE_FIELDS}
+    gst = np.where(scenarios["apply_gst"].astype(bool), GST_RATE, 0.0)
+    apply_fpa = scenarios["apply_fpa"].astype(bool).to_numpy()
+    fpa_rate = np.where(apply_fpa, rates["fpa"], 0.0)
+    fpa_gst = np.where(apply_fpa & scenarios["apply_fpa_gst"].astype(bool).to_numpy(), GST_RATE, 0.0)
+
+    base = np.stack([rates["t1"], rates["t2"], rates["fc_surcharge"] + rates["qtr"]], axis=1)
+    total = np.column_stack([base * (1 + gst)[:, None], fpa_rate * (1 + fpa_gst)])
+    return total, base, gst, fpa_rate, fpa_gst
+
+
+def sweep(data, scenarios, bill_month, fpa_month, allow_missing_prev_bill=False,
+          allow_missing_prev_fpa=False, baseline=0, with_deltas=True, deltas_dtype=np.float64,
+          months=None):
+    """Evaluate every department under every scenario.
+
+    ``scenarios`` is a frame with the ``Tariff`` field names as columns
+    (missing columns take the ``Tariff`` defaults).  Returns a
+    ``SweepResult`` whose ``totals`` frame has one row per scenario with the
+    component totals over all departments and the change in Total Bill
+    against scenario ``baseline``.  ``deltas`` is the ``(scenarios,
+    departments)`` matrix of per-department Total Bill changes against the
+    baseline scenario (``None`` if ``with_deltas`` is false).  It matches
+    ``billing_engine`` in float64; ``deltas_dtype=np.float32`` halves its
+    memory for very large sweeps at the cost of paise on large bills.
+    """
+    scenarios = _complete(scenarios)
+    cube = as_cube(data, months)
+    idx, fpa_idx = month_ordinals(cube, bill_month, fpa_month, allow_missing_prev_bill, allow_missing_prev_fpa)
+    units, _ = cube.period_units(idx, idx, allow_missing_prev_bill)
+    fpa_units, _ = cube.period_units(fpa_idx, fpa_idx, allow_missing_prev_fpa)
+
+    # (4, departments): T1, T2, total and FPA units
+    t1_units, t2_units = units[:, 0, 0], units[:, 0, 1]
+    features = np.stack([t1_units, t2_units, t1_units + t2_units, fpa_units[:, 0].sum(axis=-1)])
+    sums = features.sum(axis=1)
+
+    total_coef, base_coef, gst, fpa_rate, fpa_gst = coefficients(scenarios)
+    base_total = base_coef @ sums[:3]
+    fpa_total = fpa_rate * sums[3]
+
+    totals = scenarios.copy()
+    totals["Total Units"] = sums[2]
+    totals["Base Bill"] = base_total
+    totals["GST (18%)"] = base_total * gst
+    totals["FPA Charges"] = fpa_total
+    totals["FPA GST (18%)"] = fpa_total * fpa_gst
+    totals["Total Bill"] = total_coef @ sums
+    totals["Change vs Baseline"] = totals["Total Bill"] - totals["Total Bill"].iloc[baseline]
+
+    deltas = None
+    if with_deltas:
+        delta_coef = total_coef - total_coef[baseline]
+        deltas = (delta_coef @ features).astype(deltas_dtype, copy=False)
+    return SweepResult(totals, deltas, cube.departments)
+
+
+def _complete(scenarios):
+    scenarios = pd.DataFrame(scenarios).reset_index(drop=True)
+    unknown = set(scenarios.columns) - set(SCENARIO_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown scenario fields: {sorted(unknown)}")
+    defaults = asdict(Tariff(t1=0.0, t2=0.0))
+    for name in SCENARIO_FIELDS:
+        if name not in scenarios:
+            scenarios[name] = defaults[name]
+    for name in FLAG_FIELDS:
+        scenarios[name] = _as_flag(scenarios[name])
+    return scenarios[list(SCENARIO_FIELDS)]
+
+
+def _as_flag(column):
+    # CSV files give "True"/"yes"/"1" strings, which astype(bool) would treat as all true
+    if column.dtype == object or pd.api.types.is_string_dtype(column):
+        return column.astype(str).str.strip().str.lower().isin(["1", "1.0", "true", "yes"])
+    return column.astype(bool)
+
+
+# ---------- Command Line ----------
+def parse_grid(specs):
+    axes = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        values = [v.strip() for v in values.split(",") if v.strip()]
+        if name in FLAG_FIELDS:
+            axes[name] = [v.lower() in ("1", "true", "yes") for v in values]
+        else:
+            axes[name] = [float(v) for v in values]
+    return axes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate tariff what-if scenarios for every department.")
+    parser.add_argument("workbook", help="Excel file with '<Mon-YY> T1/T2' reading columns")
+    parser.add_argument("--month", required=True, help="bill month, e.g. Sep-24")
+    parser.add_argument("--fpa-month", help="FPA month (defaults to the bill month)")
+    parser.add_argument("--scenarios", help="CSV with one scenario per row (Tariff field names as columns)")
+    parser.add_argument("--grid", action="append", default=[], metavar="FIELD=V1,V2,...",
+                        help="sweep a field over values; repeat to build a full grid")
+    parser.add_argument("--allow-missing-prev", action="store_true",
+                        help="use the current reading when the previous month is missing")
+    parser.add_argument("--baseline", type=int, default=0, help="row of the baseline scenario")
+    parser.add_argument("--out", default="tariff_sweep.csv", help="CSV of per-scenario totals")
+    parser.add_argument("--deltas", help="optional .npy file for the scenarios x departments Total Bill deltas")
+    parser.add_argument("--deltas-float32", action="store_true",
+                        help="store the deltas as float32 (half the size, rupee-level precision on large bills)")
+    args = parser.parse_args(argv)
+
+    if not (args.scenarios or args.grid):
+        parser.error("give --scenarios or at least one --grid")
+    scenarios = pd.read_csv(args.scenarios) if args.scenarios else scenario_grid(**parse_grid(args.grid))
+
+    result = sweep(load_readings(args.workbook), scenarios, args.month, args.fpa_month or args.month,
+                   args.allow_missing_prev, args.allow_missing_prev, baseline=args.baseline,
+                   with_deltas=bool(args.deltas), deltas_dtype=np.float32 if args.deltas_float32 else np.float64)
+    result.totals.round(2).to_csv(args.out, index_label="Scenario")
+    if args.deltas:
+        np.save(args.deltas, result.deltas)
+    print(f"Evaluated {len(result.totals)} scenarios x {len(result.departments)} departments -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Round trips of pages copied by ``pdf_pages``, read back with pypdf."""
+import io
+
+import pytest
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from bill_pdf import render_bills
+from billing_engine import BILL_COLUMNS
+from pdf_pages import PdfPageWriter, read_pages
+
+ROW = dict.fromkeys(BILL_COLUMNS, 100.0)
+
+
+def bills(count, offset=0):
+    rows = [dict(ROW, Department=f"Dept {offset + i}") for i in range(count)]
+    return render_bills(rows, "Sep-24", "Aug-24", page_offset=offset)
+
+
+def merge(*sources, interned=None):
+    out = io.BytesIO()
+    writer = PdfPageWriter(out)
+    for source in sources:
+        for page in read_pages(source, interned=interned):
+            writer.add_page(page)
+    writer.close()
+    return out.getvalue()
+
+
+def test_merged_pages_read_back_in_order():
+    merged = PdfReader(io.BytesIO(merge(bills(3), bills(2, offset=3))), strict=True)
+
+    assert len(merged.pages) == 5
+    texts = [page.extract_text() for page in merged.pages]
+    assert [f"Dept {i}" in text for i, text in enumerate(texts)] == [True] * 5
+    assert "Page 5" in texts[-1]
+
+
+def test_shared_fonts_are_written_once():
+    data = merge(bills(1), bills(1, offset=1), bills(1, offset=2), interned={})
+    merged = PdfReader(io.BytesIO(data), strict=True)
+
+    fonts = [{name: ref.idnum for name, ref in page["/Resources"].raw_get("/Font").items()}
+             for page in merged.pages]
+    assert fonts[0] and fonts == [fonts[0]] * 3
+    assert data.count(b"/Type /Font") == len(fonts[0])
+
+
+def test_non_flate_streams_are_rejected():
+    writer = PdfWriter()
+    page = writer.add_blank_page(200, 200)
+    contents = DecodedStreamObject()
+    contents.set_data(b"3020302032303020726520660a>")  # "0 0 20 20 re f" in hex
+    contents[NameObject("/Filter")] = NameObject("/ASCIIHexDecode")
+    page[NameObject("/Contents")] = writer._add_object(contents)
+    source = io.BytesIO()
+    writer.write(source)
+
+    with pytest.raises(ValueError, match="Flate"):
+        read_pages(source.getvalue())
+
+
+def test_cyclic_resources_are_rejected():
+    writer = PdfWriter()
+    page = writer.add_blank_page(200, 200)
+    resources = DictionaryObject()
+    ref = writer._add_object(resources)
+    resources[NameObject("/Self")] = ref
+    page[NameObject("/Resources")] = ref
+    source = io.BytesIO()
+    writer.write(source)
+
+    with pytest.raises(ValueError, match="Cyclic"):
+        read_pages(source.getvalue())
@@ -0,0 +1,318 @@
+"""Rolling-origin backtests of the per-feeder models.
+
+The notebooks score a model on one shuffled ``train_test_split``, which lets
+later months leak into training.  Here every candidate feature set is
+evaluated time-ordered with an expanding window: for each forecast origin
+the per-feeder models are fitted on all months before it and scored on the
+next ``horizon`` months.  The (feature set, origin) fits are independent and
+are spread over a process pool; each one fits all feeders at once with
+``feeder_models.fit_feeders``.
+
+Errors are cached in a local SQLite file per (feeder, origin, horizon,
+feature set), together with a hash of the feeder's rows up to the end of the
+window.  A rerun only refits the windows whose data changed, e.g. the new
+origin after a month is appended.
+
+Usage:
+    python backtest.py "dataset temp_vs_units.xlsx" --min-train 12 --horizon 1 --out backtest.csv
+    python backtest.py feeders_5000.csv --feature-sets temperature_sq tech_non_tech --workers 8
+"""
+import argparse
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing, contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from feeder_models import GROUP, TARGET, add_features, fit_feeders, load_dataset, predict
+from incremental_models import month_labels
+
+FEATURE_SETS = {
+    "temperature": ["Temperature"],
+    "temperature_sq": ["Temperature", "Temperature_Sq"],
+    "tech_non_tech": ["Tech_Consump", "Non_Tech_Consump"],
+    "combined": ["Temperature", "Temperature_Sq", "Tech_Consump", "Non_Tech_Consump"],
+}
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "electricity_forecasting" / "backtest.sqlite"
+
+STAT_COLUMNS = ["n", "sse", "sae", "sape", "n_pct"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS windows (
+    feeder TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    horizon INTEGER NOT NULL,
+    feature_set TEXT NOT NULL,
+    target TEXT NOT NULL,
+    data_hash INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    sse REAL NOT NULL,
+    sae REAL NOT NULL,
+    sape REAL NOT NULL,
+    n_pct INTEGER NOT NULL,
+    PRIMARY KEY (feeder, origin, horizon, feature_set, target)
+)
+"""
+
+
+def cache_path():
+    return Path(os.environ.get("BACKTEST_CACHE_PATH", DEFAULT_CACHE_PATH))
+
+
+def available_feature_sets(df):
+    """The ``FEATURE_SETS`` whose columns are all in ``df``."""
+    df = add_features(df)
+    return {name: features for name, features in FEATURE_SETS.items() if set(features) <= set(df.columns)}
+
+
+def window_hashes(frame, columns, n_feeders, n_months):
+    """Cumulative hash of each feeder's rows, ``(feeders, months)`` signed 64-bit.
+
+    Entry ``[f, m]`` covers every row of feeder ``f`` up to and including
+    month ``m``, so it changes whenever any input of a window ending at ``m``
+    does.
+    """
+    rows = pd.util.hash_pandas_object(frame[["_label", GROUP, *columns]], index=False).to_numpy()
+    grid = np.zeros((n_feeders, n_months), dtype=np.uint64)
+    np.add.at(grid, (frame["_feeder"].to_numpy(), frame["_month"].to_numpy()), rows)
+    return np.cumsum(grid, axis=1).view(np.int64)  # wraps modulo 2**64
+
+
+class BacktestCache:
+    """SQLite-backed store of per-window backtest errors."""
+
+    def __init__(self, path=None):
+        self.path = Path(path or cache_path())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """A connection for one block: its writes land together or not at all, and it is closed after."""
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            yield conn
+
+    def load(self, feature_set, target, horizon):
+        query = (f"SELECT feeder, origin, data_hash, {', '.join(STAT_COLUMNS)} FROM windows "
+                 "WHERE feature_set = ? AND target = ? AND horizon = ?")
+        with self._connect() as conn:
+            stored = pd.read_sql_query(query, conn, params=[feature_set, target, horizon])
+        # windows missing from the cache merge in as NA; Int64 holds that NA without turning the hashes into floats
+        return stored.astype({"data_hash": "Int64"})
+
+    def store(self, feature_set, target, horizon, windows):
+        records = zip(windows["feeder"], windows["origin"], [horizon] * len(windows), [feature_set] * len(windows),
+                      [target] * len(windows), windows["data_hash"].astype("int64").tolist(),
+                      *(windows[col].tolist() for col in STAT_COLUMNS))
+        names = ["feeder", "origin", "horizon", "feature_set", "target", "data_hash"] + STAT_COLUMNS
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO windows ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                records,
+            )
+
+
+# ---------- Window evaluation (runs in the worker processes) ----------
+_FRAME = None
+
+
+def _init_worker(frame):
+    global _FRAME
+    _FRAME = frame
+
+
+def _evaluate(task):
+    """Fit on the months before ``origin`` and score the next ``horizon`` months.
+
+    Returns per-feeder ``(n, sse, sae, sape, n_pct)`` for the feeder codes in
+    the task (all feeders when ``None``).
+    """
+    features, target, origin, horizon, feeder_codes, n_feeders = task
+    frame = _FRAME
+    if feeder_codes is not None:
+        frame = frame[np.isin(frame["_feeder"].to_numpy(), feeder_codes)]
+    month = frame["_month"].to_numpy()
+    train = frame[month < origin]
+    test = frame[(month >= origin) & (month < origin + horizon)]
+
+    stats = np.zeros((len(STAT_COLUMNS), n_feeders))
+    test = test[test[GROUP].isin(train[GROUP].unique())]
+    if len(test) == 0:
+        return stats
+    table = fit_feeders(train, features, target)
+    actual = test[target].to_numpy(dtype=float)
+    error = actual - predict(table, test[GROUP], test[features])
+    pct = actual != 0
+    ape = np.divide(np.abs(error), np.abs(actual), out=np.zeros_like(error), where=pct)
+
+    codes = test["_feeder"].to_numpy()
+    for i, values in enumerate([np.ones_like(error), error ** 2, np.abs(error), ape, pct]):
+        stats[i] = np.bincount(codes, weights=values, minlength=n_feeders)
+    return stats
+
+
+# ---------- Backtest ----------
+def origins(n_months, min_train=12, horizon=1, step=1):
+    """Month positions of the forecast origins of an expanding-window backtest."""
+    if min_train < 1 or horizon < 1 or step < 1:
+        raise ValueError("❌ min_train, horizon and step must be at least 1")
+    return np.arange(min_train, n_months - horizon + 1, step)
+
+
+def backtest(df, feature_sets=None, target=TARGET, min_train=12, horizon=1, step=1, workers=None, cache=None):
+    """Expanding-window backtest of every feeder under every feature set.
+
+    ``feature_sets`` maps names to feature lists (default: every entry of
+    ``FEATURE_SETS`` the data supports).  ``cache`` is a ``BacktestCache`` or
+    ``None``.  Returns one row per (feature set, feeder, origin) with the
+    window's error sums; see ``summarize``.
+    """
+    df = add_features(df)
+    feature_sets = available_feature_sets(df) if feature_sets is None else dict(feature_sets)
+    if not feature_sets:
+        raise ValueError("❌ The dataset has none of the columns of any feature set")
+
+    labels = month_labels(df["Month"])
+    month_codes, months = pd.factorize(labels, sort=True)
+    feeder_codes, feeders = pd.factorize(df[GROUP].astype(str), sort=True)
+    feeders = np.asarray(feeders)
+    columns = sorted({col for features in feature_sets.values() for col in features})
+    frame = df[[GROUP, target, *columns]].assign(_label=labels, _month=month_codes, _feeder=feeder_codes)
+
+    starts = origins(len(months), min_train, horizon, step)
+    ends = starts + horizon - 1
+    n_feeders, n_origins = len(feeders), len(starts)
+
+    # per feature set: reuse every cached window whose hash still matches
+    plans = []
+    for name, features in feature_sets.items():
+        key = "+".join(features)
+        current = pd.DataFrame({
+            "feeder": np.repeat(feeders, n_origins),
+            "origin": np.tile(np.asarray(months)[starts], n_feeders),
+            "data_hash": window_hashes(frame, [target, *features], n_feeders, len(months))[:, ends].reshape(-1),
+        })
+        if cache is not None:
+            merged = current.merge(cache.load(key, target, horizon), on=["feeder", "origin"], how="left",
+                                   suffixes=("", "_stored"))
+            stale = merged["data_hash_stored"].ne(merged["data_hash"]).fillna(True).to_numpy(dtype=bool)
+            values = merged[STAT_COLUMNS].to_numpy(dtype=float)
+        else:
+            stale = np.ones(len(current), dtype=bool)
+            values = np.zeros((len(current), len(STAT_COLUMNS)))
+        plans.append((name, features, key, current, stale.reshape(n_feeders, n_origins), values))
+
+    tasks, slots = [], []
+    for p, (_, features, _, _, stale, _) in enumerate(plans):
+        for j in np.flatnonzero(stale.any(axis=0)):
+            subset = None if stale[:, j].all() else np.flatnonzero(stale[:, j])
+            tasks.append((features, target, int(starts[j]), horizon, subset, n_feeders))
+            slots.append((p, j, subset))
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(min(workers, len(tasks)), initializer=_init_worker, initargs=(frame,)) as pool:
+            results = list(pool.map(_evaluate, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+    else:
+        _init_worker(frame)
+        try:
+            results = [_evaluate(task) for task in tasks]
+        finally:
+            _init_worker(None)
+
+    out = []
+    for p, (name, _, key, current, stale, values) in enumerate(plans):
+        values = values.reshape(n_feeders, n_origins, -1)
+        for (slot_p, j, subset), stats in zip(slots, results):
+            if slot_p == p:
+                rows = slice(None) if subset is None else subset
+                values[rows, j] = stats.T[rows]
+        values = values.reshape(-1, len(STAT_COLUMNS))
+        windows = current.assign(**dict(zip(STAT_COLUMNS, values.T)))
+        if cache is not None and stale.any():
+            cache.store(key, target, horizon, windows[stale.reshape(-1)])
+        out.append(windows.assign(feature_set=name, computed=stale.reshape(-1)))
+
+    result = pd.concat(out, ignore_index=True)
+    result = result.astype({"n": int, "n_pct": int})
+    return result.rename(columns={"feature_set": "Feature Set", "feeder": "Feeder", "origin": "Origin"})
+
+
+def summarize(windows):
+    """Consolidated error table: per feature set and feeder, plus every feeder together.
+
+    ``MAE``, ``RMSE`` and ``MAPE %`` are pooled over all scored months
+    (months with zero actual units are left out of ``MAPE %``).
+    """
+    scored = windows[windows["n"] > 0]
+    per_feeder = scored.groupby(["Feature Set", "Feeder"], sort=False)[STAT_COLUMNS].sum()
+    per_feeder["Windows"] = scored.groupby(["Feature Set", "Feeder"], sort=False).size()
+    overall = scored.groupby("Feature Set", sort=False)[STAT_COLUMNS].sum()
+    overall["Windows"] = scored.groupby("Feature Set", sort=False).size()
+    overall.index = pd.MultiIndex.from_product([overall.index, ["All feeders"]], names=["Feature Set", "Feeder"])
+
+    table = pd.concat([overall, per_feeder])
+    summary = pd.DataFrame({
+        "Windows": table["Windows"],
+        "Months Scored": table["n"],
+        "MAE": table["sae"] / table["n"],
+        "RMSE": np.sqrt(table["sse"] / table["n"]),
+        "MAPE %": 100 * table["sape"] / table["n_pct"].where(table["n_pct"] > 0),
+    })
+    return summary.reset_index()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Expanding-window backtest of the per-feeder models.")
+    parser.add_argument("dataset", help="Excel or CSV file with Month, Feeder, input columns and Units_Consumed")
+    parser.add_argument("--feature-sets", nargs="+", choices=list(FEATURE_SETS), default=None,
+                        help="feature sets to compare (default: all the dataset supports)")
+    parser.add_argument("--target", default=TARGET)
+    parser.add_argument("--min-train", type=int, default=12, help="months in the first training window")
+    parser.add_argument("--horizon", type=int, default=1, help="months scored after each origin")
+    parser.add_argument("--step", type=int, default=1, help="months between origins")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--cache", default=None, help=f"cache file (default: {DEFAULT_CACHE_PATH})")
+    parser.add_argument("--no-cache", action="store_true", help="recompute every window")
+    parser.add_argument("--out", default="backtest.csv", help="consolidated error table (CSV)")
+    parser.add_argument("--windows", help="optional CSV of the per-window errors")
+    args = parser.parse_args(argv)
+
+    sys.path.append(str(Path(__file__).resolve().parent.parent))  # shared instrumentation module
+    import instrumentation as instr
+
+    instr.start_run("backtest", workers=args.workers)
+    with instr.span("read dataset"):
+        if args.dataset.endswith(".csv"):
+            df = pd.read_csv(args.dataset)
+            df.columns = df.columns.str.strip()
+        else:
+            df = load_dataset(args.dataset)
+    instr.count("rows", len(df))
+    feature_sets = None if args.feature_sets is None else {name: FEATURE_SETS[name] for name in args.feature_sets}
+    cache = None if args.no_cache else BacktestCache(args.cache)
+
+    with instr.span("fit and score windows"):
+        windows = backtest(df, feature_sets, args.target, args.min_train, args.horizon, args.step, args.workers,
+                           cache)
+    instr.count("windows", len(windows))
+    instr.count("windows computed", int(windows["computed"].sum()))
+    summary = summarize(windows)
+    summary.round(4).to_csv(args.out, index=False)
+    if args.windows:
+        windows.to_csv(args.windows, index=False)
+
+    computed = int(windows["computed"].sum())
+    print(f"{len(windows)} windows ({computed} computed, {len(windows) - computed} from cache) -> {args.out}")
+    print(summary[summary["Feeder"] == "All feeders"].round(3).to_string(index=False))
+    instr.finish()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Per-feeder linear regression models, fitted for all feeders at once.
+
+The notebooks pool every feeder into one ``LinearRegression``.  Here each
+feeder gets its own least-squares model, and all of them are fitted in one
+batched computation: rows are grouped by feeder, the per-feeder normal
+equations ``XᵀX b = Xᵀy`` are accumulated with ``np.add.reduceat``, and the
+whole ``(feeders, p, p)`` stack is solved in a single call.  Features are
+centered per feeder and scaled before the normal equations are formed
+(Temperature² is in the thousands), and the coefficients are converted back
+to raw units.
+
+Usage:
+    python feeder_models.py "dataset temp_vs_units.xlsx" --features Temperature Temperature_Sq \
+        --out feeder_coefficients.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+TARGET = "Units_Consumed"
+GROUP = "Feeder"
+
+TEMPERATURE_FEATURES = ["Temperature", "Temperature_Sq"]
+CONSUMPTION_FEATURES = ["Tech_Consump", "Non_Tech_Consump"]
+
+# relative eigenvalue cutoff for rank-deficient feeders (too few months,
+# or a feature that never changes)
+RCOND = 1e-10
+
+
+def load_dataset(path):
+    df = pd.read_excel(path)
+    df.columns = df.columns.str.strip()
+    return add_features(df)
+
+
+def add_features(df):
+    """Add the engineered features the notebooks use (``Temperature_Sq``)."""
+    if "Temperature" in df and "Temperature_Sq" not in df:
+        df = df.assign(Temperature_Sq=df["Temperature"] ** 2)
+    return df
+
+
+def design(df, features, group=GROUP):
+    """Feeder labels, per-row feeder codes and the raw feature matrix."""
+    codes, feeders = pd.factorize(df[group], sort=True)
+    X = df[list(features)].to_numpy(dtype=float)
+    return np.asarray(feeders), codes, X
+
+
+def normal_equations(codes, Z, y, n_groups):
+    """Per-group ``ZᵀZ``, ``Zᵀy``, ``yᵀy`` and row counts, in one pass over the rows."""
+    order = np.argsort(codes, kind="stable")
+    codes, Z, y = codes[order], Z[order], y[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    present = codes[starts]
+
+    p = Z.shape[1]
+    ZtZ = np.zeros((n_groups, p, p))
+    Zty = np.zeros((n_groups, p))
+    yty = np.zeros(n_groups)
+    ZtZ[present] = np.add.reduceat(Z[:, :, None] * Z[:, None, :], starts, axis=0)
+    Zty[present] = np.add.reduceat(Z * y[:, None], starts, axis=0)
+    yty[present] = np.add.reduceat(y * y, starts)
+    counts = np.bincount(codes, minlength=n_groups)
+    return ZtZ, Zty, yty, counts
+
+
+def solve(ZtZ, Zty):
+    """Least-squares coefficients for a stack of normal equations.
+
+    A pseudo-inverse keeps feeders with too few rows or constant features
+    solvable (minimum-norm solution) without failing the whole batch.
+    """
+    return np.einsum("gij,gj->gi", np.linalg.pinv(ZtZ, rcond=RCOND, hermitian=True), Zty)
+
+
+def fit_feeders(df, features, target=TARGET, group=GROUP):
+    """Fit one least-squares model per feeder.
+
+    Returns a frame indexed by feeder with ``Intercept``, one coefficient per
+    feature (in raw feature units), and the in-sample ``Rows``, ``R2`` and
+    ``MSE`` of each feeder's model.
+    """
+    features = list(features)
+    df = add_features(df)
+    feeders, codes, X = design(df, features, group)
+    y = df[target].to_numpy(dtype=float)
+
+    # center each feeder on its own means (as LinearRegression does, so a
+    # feature that never changes for a feeder gets a zero coefficient) and
+    # scale with pooled statistics to keep Temperature² well conditioned
+    counts = np.bincount(codes, minlength=len(feeders))
+    x_mean = np.stack([np.bincount(codes, weights=col, minlength=len(feeders)) for col in X.T], axis=1)
+    x_mean /= counts[:, None]
+    y_mean = np.bincount(codes, weights=y, minlength=len(feeders)) / counts
+    Xc, yc = X - x_mean[codes], y - y_mean[codes]
+    scale = Xc.std(axis=0)
+    scale[scale == 0] = 1.0
+    Z = Xc / scale
+
+    ZtZ, Zty, _, _ = normal_equations(codes, Z, yc, len(feeders))
+    beta = solve(ZtZ, Zty)
+
+    # back to raw units: y = y_mean + sum(b_j * (x_j - x_mean_j) / scale_j)
+    slopes = beta / scale
+    intercept = y_mean - (slopes * x_mean).sum(axis=1)
+
+    residual = yc - (Z * beta[codes]).sum(axis=1)
+    sse = np.bincount(codes, weights=residual ** 2, minlength=len(feeders))
+    sst = np.bincount(codes, weights=yc ** 2, minlength=len(feeders))
+
+    table = pd.DataFrame(slopes, columns=features, index=pd.Index(feeders, name=group))
+    table.insert(0, "Intercept", intercept)
+    table["Rows"] = counts
+    with np.errstate(divide="ignore", invalid="ignore"):
+        table["R2"] = np.where(sst > 0, 1 - sse / sst, np.nan)
+    table["MSE"] = sse / counts
+    return table
+
+
+def predict(table, feeders, X):
+    """Predictions for ``X`` (rows x features, in the table's feature order) of the given feeders."""
+    coef = table.drop(columns=["Rows", "R2", "MSE"])
+    rows = coef.index.get_indexer(feeders)
+    if (rows < 0).any():
+        missing = sorted(set(np.asarray(feeders)[rows < 0]))
+        raise KeyError(f"No model for feeder(s): {missing}")
+    coef = coef.to_numpy()[rows]
+    return coef[:, 0] + (coef[:, 1:] * np.asarray(X, dtype=float)).sum(axis=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit one linear regression model per feeder.")
+    parser.add_argument("dataset", help="Excel file with Feeder, the feature columns and Units_Consumed")
+    parser.add_argument("--features", nargs="+", default=None,
+                        help="feature columns (default: Temperature and Temperature_Sq, "
+                             "or Tech_Consump and Non_Tech_Consump)")
+    parser.add_argument("--target", default=TARGET)
+    parser.add_argument("--out", default="feeder_coefficients.csv")
+    args = parser.parse_args(argv)
+
+    df = load_dataset(args.dataset)
+    features = args.features or (TEMPERATURE_FEATURES if "Temperature" in df else CONSUMPTION_FEATURES)
+    table = fit_feeders(df, features, args.target)
+    table.to_csv(args.out)
+    print(f"Fitted {len(table)} feeders on {', '.join(features)} -> {args.out}")
+    print(f"Median R²: {table['R2'].median():.4f}   Median MSE: {table['MSE'].median():.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Saved per-feeder forecasting models and a fast batch prediction API.
+
+A model artifact bundles everything needed to score new inputs: the
+feature pipeline (derived ``*_Sq`` features and the standard scaler fitted on
+the training data) and one set of coefficients per feeder.  It is stored as
+two files next to each other:
+
+    <name>.json   manifest: format version, model id, features, training summary
+    <name>.npz    arrays: feeder labels, scaler mean/scale, coefficients, metrics
+
+Loading folds the scaler into the coefficients once, so scoring a batch is
+one gather of per-feeder weights and one row-wise product, with no pandas or
+sklearn import on the prediction path.
+
+Usage:
+    python forecast_model.py train "dataset temp_vs_units.xlsx" --inputs Temperature --out models/temperature
+    python forecast_model.py predict models/temperature scenarios.csv --out predictions.csv
+"""
+import argparse
+import hashlib
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+MODEL_FORMAT = 1
+SQUARED_SUFFIX = "_Sq"
+METRICS = ("Rows", "R2", "MSE")
+
+
+def derived_features(inputs):
+    """Model features for raw ``inputs``: each input, plus its square for temperature."""
+    features = list(inputs)
+    if "Temperature" in inputs:
+        features.insert(features.index("Temperature") + 1, "Temperature" + SQUARED_SUFFIX)
+    return features
+
+
+def feature_matrix(data, features):
+    """``(rows, features)`` matrix from a frame or dict of columns.
+
+    ``*_Sq`` features are computed from their base column when not given.
+    """
+    columns = []
+    for name in features:
+        if name in data:
+            columns.append(np.asarray(data[name], dtype=float))
+        elif name.endswith(SQUARED_SUFFIX) and name[:-len(SQUARED_SUFFIX)] in data:
+            base = np.asarray(data[name[:-len(SQUARED_SUFFIX)]], dtype=float)
+            columns.append(base * base)
+        else:
+            raise KeyError(f"Missing model input: {name}")
+    return np.column_stack(columns) if columns else np.empty((0, 0))
+
+
+class FeederModel:
+    """Per-feeder linear models behind a shared feature pipeline."""
+
+    def __init__(self, feeders, features, mean, scale, coef, metrics=None, meta=None):
+        self.feeders = np.asarray(feeders, dtype=str)
+        self.features = list(features)
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.coef = np.asarray(coef, dtype=float)      # (feeders, 1 + features), scaled space
+        self.metrics = {} if metrics is None else {k: np.asarray(v) for k, v in metrics.items()}
+        self.meta = dict(meta or {})
+
+        # raw-unit weights: b0 + sum(b_j * (x_j - mean_j) / scale_j)
+        self.weights = self.coef[:, 1:] / self.scale
+        self.intercepts = self.coef[:, 0] - self.weights @ self.mean
+        self._order = np.argsort(self.feeders)
+        self._sorted = self.feeders[self._order]
+
+    def __len__(self):
+        return len(self.feeders)
+
+    @property
+    def model_id(self):
+        return self.meta.get("model_id")
+
+    # ---------- Training ----------
+    @classmethod
+    def train(cls, df, inputs, target="Units_Consumed", source=None):
+        """Fit one model per feeder on ``inputs`` (plus derived features) of ``df``."""
+        from feeder_models import add_features, fit_feeders
+
+        features = derived_features(inputs)
+        df = add_features(df)
+        table = fit_feeders(df, features, target)
+        X = df[features].to_numpy(dtype=float)
+        mean, scale = X.mean(axis=0), X.std(axis=0)
+        scale[scale == 0] = 1.0
+
+        slopes = table[features].to_numpy()
+        coef = np.column_stack([table["Intercept"].to_numpy() + slopes @ mean, slopes * scale])
+        meta = {
+            "inputs": list(inputs),
+            "target": target,
+            "trained_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "source": source,
+            "rows": int(len(df)),
+        }
+        return cls(table.index, features, mean, scale, coef, {m: table[m].to_numpy() for m in METRICS}, meta)
+
+    # ---------- Persistence ----------
+    @staticmethod
+    def _files(path):
+        """``(<path>.json, <path>.npz)``; the suffixes are appended, so ``feeder.v2`` keeps its dot."""
+        path = Path(path)
+        return path.with_name(path.name + ".json"), path.with_name(path.name + ".npz")
+
+    def save(self, path):
+        """Write ``<path>.json`` and ``<path>.npz``; returns the model id."""
+        path = Path(path)
+        manifest_path, arrays_path = self._files(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {"feeders": self.feeders, "mean": self.mean, "scale": self.scale, "coef": self.coef}
+        arrays.update({f"metric_{k}": v for k, v in self.metrics.items()})
+
+        digest = hashlib.sha256()
+        for name in sorted(arrays):
+            digest.update(name.encode())
+            digest.update(np.ascontiguousarray(arrays[name]).tobytes())
+        model_id = digest.hexdigest()[:16]
+
+        np.savez(arrays_path, **arrays)
+        manifest = dict(self.meta, format=MODEL_FORMAT, model_id=model_id, features=self.features,
+                        feeders=int(len(self.feeders)))
+        manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        self.meta = manifest
+        return model_id
+
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        manifest_path, arrays_path = cls._files(path)
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if manifest.get("format") != MODEL_FORMAT:
+            raise ValueError(f"❌ Unsupported model format {manifest.get('format')} in {path} "
+                             f"(expected {MODEL_FORMAT})")
+        with np.load(arrays_path, allow_pickle=False) as npz:
+            metrics = {k[len("metric_"):]: npz[k] for k in npz.files if k.startswith("metric_")}
+            return cls(npz["feeders"], manifest["features"], npz["mean"], npz["scale"], npz["coef"],
+                       metrics, manifest)
+
+    # ---------- Prediction ----------
+    def feeder_index(self, feeders):
+        """Row of each feeder label in the model; unknown labels raise ``KeyError``."""
+        if not len(self._sorted):
+            raise ValueError("❌ The model has no feeders; train it on data with at least one feeder")
+        feeders = np.asarray(feeders, dtype=str)
+        pos = np.searchsorted(self._sorted, feeders)
+        pos[pos == len(self._sorted)] = 0
+        found = self._sorted[pos] == feeders
+        if not found.all():
+            raise KeyError(f"No model for feeder(s): {sorted(set(feeders[~found]))[:10]}")
+        return self._order[pos]
+
+    def predict(self, feeders, data):
+        """Predicted target for each row: feeder ``feeders[i]`` with inputs row ``i`` of ``data``.
+
+        ``feeders`` are labels or integer rows from ``feeder_index``;
+        ``data`` is a frame or dict of input columns.
+        """
+        idx = feeders if np.issubdtype(np.asarray(feeders).dtype, np.integer) else self.feeder_index(feeders)
+        X = feature_matrix(data, self.features)
+        return self.intercepts[idx] + np.einsum("ij,ij->i", X, self.weights[idx])
+
+    def predict_grid(self, data, feeders=None):
+        """``(rows, feeders)`` predictions of every input row for every (or the given) feeder."""
+        idx = slice(None) if feeders is None else self.feeder_index(feeders)
+        X = feature_matrix(data, self.features)
+        return X @ self.weights[idx].T + self.intercepts[idx]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train or apply saved per-feeder forecasting models.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train = sub.add_parser("train", help="fit per-feeder models and save the artifact")
+    train.add_argument("dataset", help="Excel file with Month, Feeder, inputs and Units_Consumed")
+    train.add_argument("--inputs", nargs="+", required=True, help="raw input columns, e.g. Temperature")
+    train.add_argument("--target", default="Units_Consumed")
+    train.add_argument("--out", required=True, help="artifact path without extension")
+    predict = sub.add_parser("predict", help="score a CSV of Feeder + input columns")
+    predict.add_argument("model", help="artifact path without extension")
+    predict.add_argument("inputs", help="CSV with a Feeder column and the model's input columns")
+    predict.add_argument("--out", default="predictions.csv")
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+
+    sys.path.append(str(Path(__file__).resolve().parent.parent))  # shared instrumentation module
+    import instrumentation as instr
+
+    instr.start_run(f"forecast_model {args.command}")
+    if args.command == "train":
+        from feeder_models import load_dataset
+        with instr.span("read_excel"):
+            df = load_dataset(args.dataset)
+        instr.count("rows", len(df))
+        with instr.span("fit"):
+            model = FeederModel.train(df, args.inputs, args.target, source=str(args.dataset))
+        with instr.span("save"):
+            model_id = model.save(args.out)
+        instr.count("feeders", len(model))
+        print(f"Saved {len(model)} feeder models ({', '.join(model.features)}) as {args.out} [{model_id}]")
+    else:
+        with instr.span("load model"):
+            model = FeederModel.load(args.model)
+        with instr.span("read inputs"):
+            df = pd.read_csv(args.inputs)
+        instr.count("rows", len(df))
+        with instr.span("predict"):
+            df["Predicted_Units"] = model.predict(df["Feeder"].astype(str).to_numpy(), df)
+        df.to_csv(args.out, index=False)
+        print(f"Scored {len(df)} rows with model {model.model_id} -> {args.out}")
+    instr.finish()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Incremental per-feeder regression from running sufficient statistics.
+
+Instead of re-reading the whole history and refitting every month, each
+feeder keeps its sufficient statistics: ``XᵀX`` and ``Xᵀy`` (with an
+intercept column), ``yᵀy`` and the row weight.  Folding in a new month is an
+``O(features²)`` update per feeder, and coefficients are solved from the
+statistics only when asked for, so the cost of a month close does not grow
+with the length of the history.
+
+With a forgetting factor ``λ < 1`` all statistics are multiplied by ``λ``
+for every month that passes, so a reading ``k`` months old carries weight
+``λᵏ`` (exponentially weighted least squares).  The state is a small
+``.npz`` file.
+
+Usage:
+    python incremental_models.py update state.npz "dataset temp_vs_units.xlsx" --inputs Temperature
+    python incremental_models.py update state.npz new_month.xlsx --forgetting 0.97
+    python incremental_models.py solve state.npz --out feeder_coefficients.csv --model models/temperature
+"""
+import argparse
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from feeder_models import GROUP, TARGET, normal_equations, solve
+from forecast_model import FeederModel, derived_features, feature_matrix
+
+STATE_FORMAT = 1
+
+# centered variance below this fraction of the raw second moment counts as constant
+CONSTANT_TOL = 1e-12
+
+
+def month_labels(months):
+    """Months as sortable ``YYYY-MM`` labels."""
+    return pd.to_datetime(pd.Series(months).astype(str)).dt.strftime("%Y-%m").to_numpy()
+
+
+class FeederStatistics:
+    """Running ``XᵀX``, ``Xᵀy`` and ``yᵀy`` of every feeder's regression."""
+
+    def __init__(self, inputs, forgetting=1.0, target=TARGET):
+        if not 0 < forgetting <= 1:
+            raise ValueError("❌ Forgetting factor must be in (0, 1]")
+        self.inputs = list(inputs)
+        self.features = derived_features(self.inputs)
+        self.forgetting = float(forgetting)
+        self.target = target
+        q = len(self.features) + 1
+        self.feeders = np.array([], dtype=str)
+        self.XtX = np.zeros((0, q, q))
+        self.Xty = np.zeros((0, q))
+        self.yty = np.zeros(0)
+        self.last_month = None
+
+    def __len__(self):
+        return len(self.feeders)
+
+    def _rows_for(self, labels):
+        """Feeder rows for ``labels``, adding empty statistics for new feeders."""
+        labels = np.asarray(labels, dtype=str)
+        new = np.setdiff1d(np.unique(labels), self.feeders)
+        if len(new):
+            q = self.XtX.shape[1]
+            self.feeders = np.concatenate([self.feeders, new])
+            self.XtX = np.concatenate([self.XtX, np.zeros((len(new), q, q))])
+            self.Xty = np.concatenate([self.Xty, np.zeros((len(new), q))])
+            self.yty = np.concatenate([self.yty, np.zeros(len(new))])
+        index = {feeder: i for i, feeder in enumerate(self.feeders)}
+        return np.fromiter((index[label] for label in labels), dtype=np.int64, count=len(labels))
+
+    def update(self, df):
+        """Fold the rows of ``df`` (one or more new months) into the statistics.
+
+        Months must come after every month already folded in.  Returns the
+        months that were added (none for an empty ``df``, which leaves the
+        statistics unchanged).
+        """
+        months = month_labels(df["Month"])
+        added = np.unique(months)
+        if not len(added):
+            return []
+        if self.last_month is not None and added[0] <= self.last_month:
+            raise ValueError(f"❌ Month {added[0]} is not after the last month in the state ({self.last_month})")
+
+        rows = self._rows_for(df[GROUP].astype(str).to_numpy())
+        X = feature_matrix(df, self.features)
+        Z = np.column_stack([np.ones(len(X)), X])
+        y = df[self.target].to_numpy(dtype=float)
+
+        previous = self.last_month
+        for month in added:
+            if self.forgetting < 1 and previous is not None:
+                self._decay(self.forgetting ** _months_between(previous, month))
+            sel = months == month
+            ZtZ, Zty, yty, _ = normal_equations(rows[sel], Z[sel], y[sel], len(self.feeders))
+            self.XtX += ZtZ
+            self.Xty += Zty
+            self.yty += yty
+            previous = month
+        self.last_month = previous
+        return list(added)
+
+    def _decay(self, factor):
+        self.XtX *= factor
+        self.Xty *= factor
+        self.yty *= factor
+
+    # ---------- Solving ----------
+    def solve(self):
+        """Coefficient table (same layout as ``feeder_models.fit_feeders``) from the statistics.
+
+        ``Rows`` is the effective (forgetting-weighted) number of rows.
+        """
+        n = self.XtX[:, 0, 0]
+        safe_n = np.where(n > 0, n, 1.0)
+        x_mean = self.XtX[:, 0, 1:] / safe_n[:, None]
+        y_mean = self.Xty[:, 0] / safe_n
+
+        # centered cross products, scaled to unit diagonal for conditioning
+        Cxx = self.XtX[:, 1:, 1:] - n[:, None, None] * x_mean[:, :, None] * x_mean[:, None, :]
+        Cxy = self.Xty[:, 1:] - n[:, None] * x_mean * y_mean[:, None]
+        variance = np.einsum("gii->gi", Cxx)
+        # a feature that never changes for a feeder (up to cancellation) gets a zero coefficient
+        constant = variance <= CONSTANT_TOL * np.einsum("gii->gi", self.XtX[:, 1:, 1:])
+        keep = ~constant
+        Cxx = Cxx * (keep[:, :, None] & keep[:, None, :])
+        Cxy = Cxy * keep
+        scale = np.where(constant, 1.0, np.sqrt(np.clip(variance, 0, None)))
+        beta = solve(Cxx / (scale[:, :, None] * scale[:, None, :]), Cxy / scale)
+
+        slopes = beta / scale
+        intercept = y_mean - (slopes * x_mean).sum(axis=1)
+        b = np.column_stack([intercept, slopes])
+        sse = self.yty - 2 * (b * self.Xty).sum(axis=1) + np.einsum("gi,gij,gj->g", b, self.XtX, b)
+        sse = np.clip(sse, 0, None)
+        syy = self.yty - n * y_mean ** 2
+
+        table = pd.DataFrame(slopes, columns=self.features, index=pd.Index(self.feeders, name=GROUP))
+        table.insert(0, "Intercept", intercept)
+        table["Rows"] = n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            table["R2"] = np.where(syy > 0, 1 - sse / syy, np.nan)
+            table["MSE"] = sse / n
+        return table.sort_index()
+
+    def model(self):
+        """A ``FeederModel`` for prediction, with the scaler from the pooled statistics."""
+        table = self.solve()
+        total = self.XtX.sum(axis=0)
+        mean = total[0, 1:] / total[0, 0]
+        scale = np.sqrt(np.clip(np.diag(total)[1:] / total[0, 0] - mean ** 2, 0, None))
+        scale[scale == 0] = 1.0
+        slopes = table[self.features].to_numpy()
+        coef = np.column_stack([table["Intercept"].to_numpy() + slopes @ mean, slopes * scale])
+        meta = {"inputs": self.inputs, "target": self.target, "last_month": self.last_month,
+                "forgetting": self.forgetting, "rows": float(total[0, 0])}
+        metrics = {m: table[m].to_numpy() for m in ("Rows", "R2", "MSE")}
+        return FeederModel(table.index, self.features, mean, scale, coef, metrics, meta)
+
+    # ---------- Persistence ----------
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                np.savez(fh, format=STATE_FORMAT, inputs=np.array(self.inputs, dtype=str),
+                         target=self.target, forgetting=self.forgetting, last_month=self.last_month or "",
+                         feeders=self.feeders, XtX=self.XtX, Xty=self.Xty, yty=self.yty)
+            os.replace(tmp, path)  # a crash mid-write never leaves a half-written state
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as npz:
+            if int(npz["format"]) != STATE_FORMAT:
+                raise ValueError(f"❌ Unsupported state format {int(npz['format'])} in {path}")
+            stats = cls(npz["inputs"].tolist(), float(npz["forgetting"]), str(npz["target"]))
+            stats.feeders = npz["feeders"]
+            stats.XtX, stats.Xty, stats.yty = npz["XtX"], npz["Xty"], npz["yty"]
+            stats.last_month = str(npz["last_month"]) or None
+        return stats
+
+
+def _months_between(earlier, later):
+    y1, m1 = map(int, earlier.split("-"))
+    y2, m2 = map(int, later.split("-"))
+    return (y2 - y1) * 12 + (m2 - m1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep per-feeder regressions up to date month by month.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    update = sub.add_parser("update", help="fold new months into the state (created if missing)")
+    update.add_argument("state", help="state file (.npz)")
+    update.add_argument("dataset", help="Excel file with the new months' Month, Feeder, inputs and target")
+    update.add_argument("--inputs", nargs="+", default=["Temperature"], help="raw inputs (new state only)")
+    update.add_argument("--forgetting", type=float, default=1.0, help="per-month forgetting factor (new state only)")
+    solve_cmd = sub.add_parser("solve", help="solve coefficients from the state")
+    solve_cmd.add_argument("state")
+    solve_cmd.add_argument("--out", default="feeder_coefficients.csv")
+    solve_cmd.add_argument("--model", help="also save a forecast_model artifact at this path")
+    args = parser.parse_args(argv)
+
+    if args.command == "update":
+        path = Path(args.state)
+        stats = FeederStatistics.load(path) if path.exists() else FeederStatistics(args.inputs, args.forgetting)
+        added = stats.update(pd.read_excel(args.dataset))
+        if not len(added):
+            print(f"No rows in {args.dataset}; {path} is unchanged")
+            return
+        stats.save(path)
+        print(f"Added {len(added)} month(s) ({added[0]} to {added[-1]}) for {len(stats)} feeders -> {path}")
+    else:
+        stats = FeederStatistics.load(args.state)
+        table = stats.solve()
+        table.to_csv(args.out)
+        print(f"Solved {len(table)} feeders through {stats.last_month} -> {args.out}")
+        if args.model:
+            model_id = stats.model().save(args.model)
+            print(f"Saved model {model_id} to {args.model}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Joint temperature + tech/non-tech model and vectorized scenario sweeps.
+
+The tech/non-tech notebook adds a fixed ``temp_based_units = 130`` to every
+feeder's prediction instead of calling the temperature model.  Here the two
+datasets are joined on (Month, Feeder) and one model per feeder is fitted on
+Temperature, Temperature², Tech_Consump and Non_Tech_Consump together.  The
+target is the sum of both datasets' units, i.e. the notebook's "prediction
+plus temperature-based units" as one quantity.
+
+A scenario grid is every temperature × every consumption assumption × every
+feeder.  The model is linear, so the temperature terms ``(temperatures,
+feeders)`` and the consumption terms ``(assumptions, feeders)`` are computed
+once each and broadcast together; totals over feeders never need the full
+three-dimensional grid.
+
+Usage:
+    python scenario_forecast.py train "dataset temp_vs_units.xlsx" "dataset tech_non_tech.xlsx" --out models/joint
+    python scenario_forecast.py sweep models/joint --temperatures 5 45 0.5 --tech 400 500 600 --non-tech 150 \
+        --out scenario_totals.csv --per-feeder scenario_feeders.csv
+"""
+import argparse
+
+import numpy as np
+
+from feeder_models import GROUP, TARGET
+from forecast_model import SQUARED_SUFFIX, FeederModel, feature_matrix
+
+WEATHER_INPUTS = ["Temperature"]
+CONSUMPTION_INPUTS = ["Tech_Consump", "Non_Tech_Consump"]
+JOINT_INPUTS = WEATHER_INPUTS + CONSUMPTION_INPUTS
+
+
+def combine_datasets(temperature_df, consumption_df, target=TARGET):
+    """One row per (Month, Feeder) with temperature, consumption and the combined target.
+
+    ``target`` is the temperature dataset's units plus the consumption
+    dataset's units.  Rows present in only one dataset are dropped.
+    """
+    from incremental_models import month_labels
+
+    keys = ["Month", GROUP]
+    temp = temperature_df[keys + WEATHER_INPUTS + [target]].assign(Month=month_labels(temperature_df["Month"]))
+    cons = consumption_df[keys + CONSUMPTION_INPUTS + [target]].assign(Month=month_labels(consumption_df["Month"]))
+    joint = temp.merge(cons, on=keys, how="inner", suffixes=("_Temp", "_Cons"), validate="one_to_one")
+    joint[target] = joint[target + "_Temp"] + joint[target + "_Cons"]
+    return joint.drop(columns=[target + "_Temp", target + "_Cons"])
+
+
+def train_joint(df, target=TARGET, source=None):
+    """Per-feeder ``FeederModel`` on Temperature, Temperature², Tech_Consump and Non_Tech_Consump."""
+    return FeederModel.train(df, JOINT_INPUTS, target, source=source)
+
+
+def _columns(model, inputs):
+    """Positions of the model features derived from ``inputs``."""
+    return [i for i, name in enumerate(model.features)
+            if name in inputs or name.removesuffix(SQUARED_SUFFIX) in inputs]
+
+
+def forecast_scenarios(model, weather, consumption, feeders=None, per_feeder=True):
+    """Predicted units for every weather scenario × consumption assumption × feeder.
+
+    ``weather`` is a frame or dict of weather input columns, one value per
+    scenario (length ``W``).  ``consumption`` holds the consumption inputs,
+    each either one value per assumption (length ``C``, applied to every
+    feeder) or a ``(C, feeders)`` array of per-feeder assumptions.
+
+    Returns ``(units, totals)``: ``units`` is ``(W, C, feeders)`` (``None``
+    when ``per_feeder`` is false) and ``totals`` is ``(W, C)``, summed over
+    the feeders.
+    """
+    idx = np.arange(len(model)) if feeders is None else model.feeder_index(feeders)
+    weights, intercepts = model.weights[idx], model.intercepts[idx]
+
+    w_cols = _columns(model, WEATHER_INPUTS)
+    c_cols = _columns(model, CONSUMPTION_INPUTS)
+    if len(w_cols) + len(c_cols) != len(model.features):
+        raise ValueError(f"❌ Model features {model.features} are not all weather or consumption inputs")
+
+    weather_part = feature_matrix(weather, [model.features[i] for i in w_cols]) @ weights[:, w_cols].T  # (W, F)
+
+    c_names = [model.features[i] for i in c_cols]
+    values = [np.asarray(consumption[name], dtype=float) for name in c_names]
+    n_assumptions = len(values[0]) if values else 1
+    consumption_part = np.zeros((n_assumptions, len(idx)))
+    for name, col, value in zip(c_names, c_cols, values):
+        if value.ndim == 1:
+            value = value[:, None]
+        if value.shape[0] != n_assumptions or value.shape[1] not in (1, len(idx)):
+            raise ValueError(f"❌ {name} must have one value per assumption, or one per assumption and feeder")
+        consumption_part += value * weights[:, col]
+
+    totals = (weather_part.sum(axis=1)[:, None] + consumption_part.sum(axis=1)[None, :] + intercepts.sum())
+    units = None
+    if per_feeder:
+        units = intercepts + weather_part[:, None, :] + consumption_part[None, :, :]
+    return units, totals
+
+
+def scenario_frames(model, weather, consumption, feeders=None, per_feeder=True):
+    """``forecast_scenarios`` as long frames: totals per scenario, and units per scenario and feeder."""
+    import pandas as pd
+
+    units, totals = forecast_scenarios(model, weather, consumption, feeders, per_feeder)
+    weather = pd.DataFrame({name: np.asarray(weather[name], dtype=float) for name in WEATHER_INPUTS
+                            if name in weather}).rename_axis("Weather").reset_index()
+    assumptions = pd.DataFrame({
+        name: np.asarray(consumption[name], dtype=float)
+        for name in CONSUMPTION_INPUTS if name in consumption and np.ndim(consumption[name]) == 1
+    }, index=pd.RangeIndex(totals.shape[1], name="Assumption")).reset_index()
+
+    grid = weather.merge(assumptions, how="cross")
+    grid["Total_Predicted_Units"] = totals.reshape(-1)
+    if units is None:
+        return grid, None
+
+    labels = model.feeders if feeders is None else np.asarray(feeders, dtype=str)
+    per_feeder_frame = pd.DataFrame({
+        "Weather": np.repeat(np.arange(units.shape[0]), units.shape[1] * units.shape[2]),
+        "Assumption": np.tile(np.repeat(np.arange(units.shape[1]), units.shape[2]), units.shape[0]),
+        GROUP: np.tile(labels, units.shape[0] * units.shape[1]),
+        "Predicted_Units": units.reshape(-1),
+    })
+    return grid, per_feeder_frame
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Joint per-feeder model and weather x consumption scenario sweeps.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train = sub.add_parser("train", help="fit the joint model on both datasets and save the artifact")
+    train.add_argument("temperature_dataset", help="Excel file with Month, Feeder, Temperature, Units_Consumed")
+    train.add_argument("consumption_dataset", help="Excel file with Month, Feeder, Tech_Consump, Non_Tech_Consump, "
+                                                   "Units_Consumed")
+    train.add_argument("--out", required=True, help="artifact path without extension")
+    sweep = sub.add_parser("sweep", help="predict every temperature x consumption assumption x feeder")
+    sweep.add_argument("model", help="artifact path without extension")
+    sweep.add_argument("--temperatures", nargs=3, type=float, required=True, metavar=("START", "STOP", "STEP"),
+                       help="temperature range (STOP included)")
+    sweep.add_argument("--tech", nargs="+", type=float, required=True, help="Tech_Consump values")
+    sweep.add_argument("--non-tech", nargs="+", type=float, required=True, help="Non_Tech_Consump values")
+    sweep.add_argument("--feeders", nargs="+", default=None, help="feeders to include (default: all)")
+    sweep.add_argument("--out", default="scenario_totals.csv", help="total units per scenario (CSV)")
+    sweep.add_argument("--per-feeder", help="optional CSV of the units per scenario and feeder")
+    args = parser.parse_args(argv)
+
+    if args.command == "train":
+        from feeder_models import load_dataset
+
+        df = combine_datasets(load_dataset(args.temperature_dataset), load_dataset(args.consumption_dataset))
+        model = train_joint(df, source=f"{args.temperature_dataset} + {args.consumption_dataset}")
+        model_id = model.save(args.out)
+        print(f"Saved {len(model)} joint feeder models ({', '.join(model.features)}) as {args.out} [{model_id}]")
+        print(f"Median R²: {np.median(model.metrics['R2']):.4f}   Median MSE: {np.median(model.metrics['MSE']):.2f}")
+    else:
+        model = FeederModel.load(args.model)
+        start, stop, step = args.temperatures
+        weather = {"Temperature": np.arange(start, stop + step / 2, step)}
+        tech, non_tech = np.meshgrid(args.tech, args.non_tech, indexing="ij")
+        consumption = {"Tech_Consump": tech.ravel(), "Non_Tech_Consump": non_tech.ravel()}
+        totals, per_feeder = scenario_frames(model, weather, consumption, args.feeders, bool(args.per_feeder))
+        totals.round(2).to_csv(args.out, index=False)
+        if per_feeder is not None:
+            per_feeder.round(2).to_csv(args.per_feeder, index=False)
+        n_feeders = len(args.feeders) if args.feeders else len(model)
+        print(f"{len(totals)} scenarios ({len(weather['Temperature'])} temperatures x {tech.size} consumption "
+              f"assumptions) over {n_feeders} feeders -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""Tests of the running per-feeder statistics."""
+from incremental_models import FeederStatistics
+from synthetic_feeders import synthetic_feeders
+
+
+def test_update_returns_the_added_months():
+    stats = FeederStatistics(["Temperature"])
+    added = stats.update(synthetic_feeders(3, n_months=4, first_month="2024-11"))
+
+    assert added == ["2024-11", "2024-12", "2025-01", "2025-02"]
+    assert isinstance(added, list)
+    assert len(stats) == 3 and stats.last_month == "2025-02"
+
+
+def test_empty_update_returns_an_empty_list():
+    stats = FeederStatistics(["Temperature"])
+    stats.update(synthetic_feeders(2, n_months=3))
+    XtX = stats.XtX.copy()
+
+    added = stats.update(synthetic_feeders(2, n_months=3).iloc[:0])
+
+    assert added == [] and isinstance(added, list)
+    assert (stats.XtX == XtX).all() and stats.last_month == "2022-03"
@@ -0,0 +1,127 @@
+"""Cold-start benchmark of the Streamlit tools.
+
+Every repeat starts a fresh Python process per app (a new server worker),
+which runs the app script once with Streamlit's ``AppTest`` and times:
+
+    import       ``import streamlit``
+    first_render the first run of the script, up to the page being shown
+    rerun        a second run in the same process
+    warm         the background imports started after the first render
+
+and records which heavy modules (pandas, NumPy, pyarrow, fpdf) were already
+imported when the first render finished.  Medians over the repeats are
+printed and one JSON object per app is appended to the results file.
+
+Usage:
+    python bench_startup.py --repeats 5 --out startup_results.jsonl
+    BOQ_DEFAULT_SCHEDULE="BOQ Estimation/item_schedule.xlsx" python bench_startup.py --apps boq
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+APPS = {
+    "billing": ROOT / "Electricity Billing System" / "Electricity_Billing_System.py",
+    "boq": ROOT / "BOQ Estimation" / "app_v1.2.py",
+}
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow", "fpdf"]
+TIMINGS = ["import", "first_render", "rerun", "warm"]
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=ROOT, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def measure(script):
+    """Timings of one cold start of ``script`` in this (fresh) process."""
+    start = time.perf_counter()
+    import streamlit  # noqa: F401
+    from streamlit.testing.v1 import AppTest
+    result = {"import": time.perf_counter() - start}
+
+    # hold back the background imports so the first render is measured on its own
+    sys.path.append(str(ROOT))
+    import startup
+    deferred = []
+    warm_imports = startup.warm_imports
+    startup.warm_imports = lambda *modules, **kwargs: deferred.append((modules, kwargs))
+
+    at = AppTest.from_file(str(script), default_timeout=120)
+    start = time.perf_counter()
+    at.run()
+    result["first_render"] = time.perf_counter() - start
+    result["loaded"] = [name for name in HEAVY_MODULES if name in sys.modules]
+    if at.exception:
+        result["error"] = at.exception[0].value
+
+    start = time.perf_counter()
+    at.run()
+    result["rerun"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if deferred:
+        modules, kwargs = deferred[0]
+        warm_imports(*modules, **kwargs).result()
+    result["warm"] = time.perf_counter() - start
+    return result
+
+
+def cold_start(app):
+    out = subprocess.run([sys.executable, __file__, "--child", app], capture_output=True, text=True,
+                         cwd=APPS[app].parent, timeout=600)
+    if out.returncode != 0:
+        raise RuntimeError(f"{app} cold start failed:\n{out.stderr}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cold start of the Streamlit tools.")
+    parser.add_argument("--apps", nargs="+", choices=sorted(APPS), default=sorted(APPS))
+    parser.add_argument("--repeats", type=int, default=5, help="fresh processes per app")
+    parser.add_argument("--out", default="startup_results.jsonl", help="JSON lines results file (appended)")
+    parser.add_argument("--child", choices=sorted(APPS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(APPS[args.child])))
+        return
+
+    run = {
+        "run_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "default_schedule": os.environ.get("BOQ_DEFAULT_SCHEDULE"),
+    }
+    with open(args.out, "a", encoding="utf-8") as out:
+        for app in args.apps:
+            samples = [cold_start(app) for _ in range(args.repeats)]
+            record = dict(run, app=app, repeats=args.repeats,
+                          loaded_at_first_render=samples[-1]["loaded"],
+                          **{name: statistics.median(s[name] for s in samples) for name in TIMINGS})
+            errors = [s["error"] for s in samples if "error" in s]
+            if errors:
+                record["error"] = errors[0]
+            out.write(json.dumps(record) + "\n")
+
+            print(f"{app}: " + "  ".join(f"{name} {record[name]:.3f}s" for name in TIMINGS)
+                  + f"  loaded: {', '.join(record['loaded_at_first_render']) or 'none'}"
+                  + (f"  ERROR: {record['error']}" if errors else ""))
+    print(f"Results appended to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Lightweight per-stage instrumentation shared by the billing, BOQ and forecasting tools.
+
+A run is a named list of timed spans plus counters (rows, pages, items ...).
+Finishing a run appends it as one JSON line to a log file, and the
+Streamlit apps can show it in a sidebar panel::
+
+    import instrumentation as instr
+
+    instr.start_run("billing", file=name)
+    with instr.span("read_excel"):
+        df = pd.read_excel(source)
+    instr.count("rows", len(df))
+    record = instr.finish()
+
+Recording is off unless ``INSTRUMENTATION=1`` (or ``enable()``).  When off,
+``span`` returns a shared no-op context manager and ``count`` returns at
+once, so the calls can stay in production code.
+
+Settings (environment variables):
+    INSTRUMENTATION         1 to record runs (default: off)
+    INSTRUMENTATION_LOG     JSON-lines file (default: ~/.cache/instrumentation/runs.jsonl)
+    INSTRUMENTATION_MEMORY  "rss" (default): process peak RSS at the end of each span, free to sample;
+                            "tracemalloc": peak Python allocations inside each span (slows the run down)
+"""
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # not available on Windows; memory columns are left empty
+    resource = None
+
+DEFAULT_LOG_PATH = Path.home() / ".cache" / "instrumentation" / "runs.jsonl"
+
+_enabled = os.environ.get("INSTRUMENTATION", "").lower() in ("1", "true", "yes", "on")
+_local = threading.local()  # Streamlit runs each session's script in its own thread
+
+
+def log_path():
+    return Path(os.environ.get("INSTRUMENTATION_LOG", DEFAULT_LOG_PATH))
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = bool(on)
+
+
+def enabled():
+    return _enabled
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far, in MB (``None`` where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class Run:
+    """Spans and counters of one run (one CLI call, or one Streamlit rerun)."""
+
+    def __init__(self, name, meta):
+        self.name = name
+        self.meta = meta
+        self.started = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.spans = []
+        self.counters = {}
+        self.stack = []
+        self.tracemalloc = os.environ.get("INSTRUMENTATION_MEMORY", "rss") == "tracemalloc"
+        if self.tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def record(self):
+        return {
+            "run": self.name,
+            "started": self.started.isoformat(timespec="seconds"),
+            "seconds": round(time.perf_counter() - self.start, 6),
+            "peak_rss_mb": peak_rss_mb(),
+            "spans": self.spans,
+            "counters": self.counters,
+            **self.meta,
+        }
+
+
+class _Span:
+    __slots__ = ("run", "entry", "start", "peak")
+
+    def __init__(self, run, name):
+        self.run = run
+        self.entry = {"name": name, "depth": len(run.stack)}
+        self.peak = 0
+
+    def __enter__(self):
+        run = self.run
+        run.spans.append(self.entry)  # in start order, so nested spans follow their parent
+        run.stack.append(self)
+        if run.tracemalloc:
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        run = self.run
+        run.stack.pop()
+        self.entry["offset"] = round(self.start - run.start, 6)
+        self.entry["seconds"] = round(seconds, 6)
+        if run.tracemalloc:
+            # a nested span resets the tracemalloc peak, so carry its peak up to the parent
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            self.entry["peak_mb"] = round(self.peak / (1024 * 1024), 3)
+            if run.stack:
+                run.stack[-1].peak = max(run.stack[-1].peak, self.peak)
+        else:
+            self.entry["peak_mb"] = peak_rss_mb()
+        if exc[0] is not None:
+            self.entry["error"] = exc[0].__name__
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def start_run(name, **meta):
+    """Start recording a run in this thread (replacing any unfinished one); ``None`` when disabled."""
+    run = Run(name, meta) if _enabled else None
+    _local.run = run
+    return run
+
+
+def current_run():
+    return getattr(_local, "run", None)
+
+
+def span(name):
+    """Context manager timing the stage ``name`` of the current run."""
+    run = getattr(_local, "run", None)
+    if run is None:
+        return _NULL_SPAN
+    return _Span(run, name)
+
+
+def count(name, n=1):
+    """Add ``n`` to the counter ``name`` of the current run."""
+    run = getattr(_local, "run", None)
+    if run is not None:
+        run.counters[name] = run.counters.get(name, 0) + n
+
+
+def finish(path=None):
+    """End the current run, append it to the JSON-lines log and return its record."""
+    run = getattr(_local, "run", None)
+    if run is None:
+        return None
+    _local.run = None
+    record = run.record()
+    path = Path(path or log_path())
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(record, default=str) + "\n")
+    except OSError:
+        pass  # instrumentation must never break the tool it measures
+    return record
+
+
+def sidebar_panel(st, record):
+    """Show a finished run's per-stage breakdown in a collapsed Streamlit sidebar expander."""
+    if record is None:
+        return
+    with st.sidebar.expander(f"⏱️ Stage timings ({record['seconds']:.2f} s)"):
+        st.dataframe(
+            [{"Stage": "  " * s["depth"] + s["name"], "Seconds": s.get("seconds"), "Peak MB": s.get("peak_mb")}
+             for s in record["spans"]],
+            use_container_width=True, hide_index=True,
+        )
+        if record["counters"]:
+            st.markdown("  \n".join(f"**{name}:** {value:,}" for name, value in record["counters"].items()))
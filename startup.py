@@ -0,0 +1,92 @@
+"""Cold-start helpers shared by the Streamlit tools.
+
+The apps import pandas, NumPy and fpdf only on the paths that need them, so
+the first page render of a fresh worker does not wait for them.  Two helpers
+take the remaining work off the request path:
+
+``preload(key, fn, *args)``
+    Runs ``fn(*args)`` once per process in a background thread and returns
+    its ``Future``, e.g. compiling the configured default item schedule.
+``warm_imports(*modules)``
+    Imports modules in the background once the first page has been sent,
+    so the first upload finds pandas and the billing engine already loaded.
+
+Both are no-ops after the first call with the same key, so they can be called
+on every Streamlit rerun.  A failed warm-up is logged and dropped, so the
+next rerun tries it again.
+"""
+import importlib
+import importlib.abc
+import importlib.machinery
+import logging
+import sys
+import threading
+from concurrent.futures import Future
+
+_lock = threading.Lock()
+_jobs = {}
+_log = logging.getLogger(__name__)
+
+
+def preload(key, fn, *args):
+    """``Future`` of ``fn(*args)``, started in a daemon thread on the first call for ``key``."""
+    with _lock:
+        future = _jobs.get(key)
+        if future is not None:
+            return future
+        future = _jobs[key] = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as exc:  # surfaced to whoever asks for the result
+            future.set_exception(exc)
+
+    threading.Thread(target=run, name=f"preload-{key}", daemon=True).start()
+    return future
+
+
+def warm_imports(*modules, path=None):
+    """Import ``modules`` in the background (once per process); returns the ``Future``.
+
+    Streamlit puts the app's directory on ``sys.path`` only while the script
+    runs, so modules next to the app need their directory passed as ``path``.
+    It is searched by the warming thread only; ``sys.path`` is left alone, and
+    later imports of the modules are served from ``sys.modules``.
+    """
+    key = ("imports",) + modules
+
+    def run():
+        _finder.dirs = None if path is None else [str(path)]
+        try:
+            return [importlib.import_module(name) for name in modules]
+        except Exception:
+            _log.warning("Warming imports %s failed", ", ".join(modules), exc_info=True)
+            with _lock:
+                _jobs.pop(key, None)  # the next call tries again
+            raise
+        finally:
+            _finder.dirs = None
+
+    return preload(key, run)
+
+
+class _ThreadPathFinder(importlib.abc.MetaPathFinder, threading.local):
+    """Finds top-level modules in ``dirs``, set per thread, after ``sys.path`` has been searched.
+
+    Unlike putting the directory on ``sys.path``, this does not change what
+    imports in other threads (a concurrent script run) resolve to.
+    """
+
+    dirs = None
+
+    def find_spec(self, name, path=None, target=None):
+        if path is not None or not self.dirs:
+            return None
+        return importlib.machinery.PathFinder.find_spec(name, self.dirs)
+
+
+_finder = _ThreadPathFinder()
+sys.meta_path.append(_finder)